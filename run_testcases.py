@@ -5,16 +5,37 @@ import os
 import sys
 import json
 import argparse
+import sysconfig
 import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Set, Dict, List, Any
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+# Project-local virtual environment and its site-packages directory
+VENV_PATH = os.path.join(os.path.dirname(__file__), '.venv')
+
+def _venv_site_packages(venv_path):
+    """Returns the site-packages directory of the virtual environment at venv_path."""
+    # The default install scheme is not always a venv layout (e.g. posix_local on Debian's
+    # system Python), so use the dedicated 'venv' scheme where it exists (Python 3.11+).
+    if 'venv' in sysconfig.get_scheme_names():
+        return sysconfig.get_paths(scheme='venv', vars={'base': venv_path, 'platbase': venv_path})['purelib']
+    if os.name == 'nt':
+        return os.path.join(venv_path, 'Lib', 'site-packages')
+    return os.path.join(venv_path, 'lib', f'python{sys.version_info.major}.{sys.version_info.minor}', 'site-packages')
+
+VENV_SITE_PACKAGES = _venv_site_packages(VENV_PATH)
+
 # Add the src directory to the path so we can import the modules
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from environment.environment import WumpusWorldEnvironment
 from agent.agent import WumpusWorldAgent
-from utils.display import WumpusWorldDisplay
 from utils.constants import (
     GAME_STATE_PLAYING,
     GAME_STATE_WON,
@@ -31,31 +52,43 @@ def load_testcase(testcase_file):
         testcase = json.load(f)
     return testcase
 
+def validate_testcase(config):
+    """Raise ValueError if a testcase configuration is missing required fields."""
+    for key in ('N', 'gold_position'):
+        if config.get(key) is None:
+            raise ValueError(f"missing required field '{key}'")
+    return config
+
 def create_custom_environment(config):
     """Create a custom environment with a predefined map."""
     N = config.get('N')
-    env = WumpusWorldEnvironment(N, 0, 0)  # K and p don't matter as we'll manually set the map
     
     # Initialize empty map
-    env.game_map = [[set() for _ in range(N)] for _ in range(N)]
+    game_map = [[set() for _ in range(N)] for _ in range(N)]
     
     # Place wumpuses
     for wx, wy in config.get('wumpus_positions', []):
-        env.game_map[wx][wy].add(WUMPUS_SYMBOL)
+        game_map[wx][wy].add(WUMPUS_SYMBOL)
     
     # Place pits
     for px, py in config.get('pit_positions', []):
-        env.game_map[px][py].add(PIT_SYMBOL)
+        game_map[px][py].add(PIT_SYMBOL)
     
     # Place gold
     gx, gy = config.get('gold_position')
-    env.game_map[gx][gy].add(GOLD_SYMBOL)
+    game_map[gx][gy].add(GOLD_SYMBOL)
     
-    return env
+    # Hand the map to the environment directly so it never generates a random one
+    return WumpusWorldEnvironment(N, 0, 0, game_map=game_map)  # K and p don't matter with a predefined map
 
-def run_testcase(testcase_path, use_gui=False):
-    """Run a specific testcase and return the results."""
-    testcase = load_testcase(testcase_path)
+def run_testcase(testcase_path, use_gui=False, testcase=None):
+    """Run a specific testcase and return the results.
+
+    If `testcase` is given it is used as the already-loaded configuration for
+    `testcase_path` instead of reading the file again.
+    """
+    if testcase is None:
+        testcase = load_testcase(testcase_path)
     
     # Create environment from testcase config
     env = create_custom_environment(testcase)
@@ -64,14 +97,23 @@ def run_testcase(testcase_path, use_gui=False):
     # Create agent
     agent = WumpusWorldAgent(N)
     
-    # Use text display for logging
-    display = WumpusWorldDisplay(N)
-    
-    # Initialize log
+    # Initialize log. Steps are stored column-wise: one list per field, indexed by step.
+    # A run is capped at max_steps, so the whole log stays small enough to keep in
+    # memory and hand back from a worker process; save_log writes it in one pass.
+    steps = {
+        "step": [],
+        "agent_pos": [],
+        "agent_dir": [],
+        "agent_has_gold": [],
+        "percepts": [],
+        "score": [],
+        "action": [],
+        "action_result": [],
+    }
     log = {
         "testcase_name": os.path.basename(testcase_path),
         "config": testcase,
-        "steps": [],
+        "steps": steps,
         "final_state": None,
     }
     
@@ -79,38 +121,34 @@ def run_testcase(testcase_path, use_gui=False):
     step_count = 0
     max_steps = 500
     
+    # Sync the agent once up front; afterwards the post-action sync below keeps it
+    # current, since the environment only changes inside apply_action.
+    agent.update_state(env.get_current_state())
+    
     while env.game_state == GAME_STATE_PLAYING and step_count < max_steps:
         step_count += 1
         
-        # Get percepts and current state
+        # Get percepts for the current cell
         current_percepts = env.get_percepts()
-        env_state = env.get_current_state()
-        agent.update_state(env_state)
         
         # Log agent knowledge and percepts before action
-        step_log = {
-            "step": step_count,
-            "agent_pos": agent.agent_pos,
-            "agent_dir": agent.agent_dir,
-            "agent_has_gold": agent.agent_has_gold,
-            "percepts": current_percepts,
-            "score": agent.score,
-        }
+        steps["step"].append(step_count)
+        steps["agent_pos"].append(agent.agent_pos)
+        steps["agent_dir"].append(agent.agent_dir)
+        steps["agent_has_gold"].append(agent.agent_has_gold)
+        steps["percepts"].append(current_percepts)
+        steps["score"].append(agent.score)
         
         # Agent makes a decision
         chosen_action = agent.decide_action(current_percepts)
-        step_log["action"] = chosen_action
+        steps["action"].append(chosen_action)
         
         # Environment processes the action
         action_result = env.apply_action(chosen_action)
-        step_log["action_result"] = action_result
+        steps["action_result"].append(action_result)
         
         # Update agent state after action
-        env_state = env.get_current_state()
-        agent.update_state(env_state)
-        
-        # Add step to log
-        log["steps"].append(step_log)
+        agent.update_state(env.get_current_state())
     
     # Final state
     log["final_state"] = {
@@ -125,66 +163,84 @@ def run_testcase(testcase_path, use_gui=False):
     
     return log
 
-class SetEncoder(json.JSONEncoder):
-    """Custom JSON encoder that can handle sets by converting them to lists."""
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return json.JSONEncoder.default(self, obj)
+def _json_default(obj):
+    """Serialize the sets found in maps and percepts as lists."""
+    if isinstance(obj, set):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 def save_log(log, output_dir):
-    """Save the log to a file."""
+    """Save the log to a file in `output_dir`, which must already exist."""
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     testcase_name = log["testcase_name"].replace('.json', '')
     log_filename = f"{testcase_name}_{timestamp}.json"
     log_path = os.path.join(output_dir, log_filename)
     
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Convert sets to lists for JSON serialization
-    def convert_sets_to_lists(obj):
-        if isinstance(obj, set):
-            return list(obj)
-        elif isinstance(obj, list):
-            return [convert_sets_to_lists(item) for item in obj]
-        elif isinstance(obj, dict):
-            return {key: convert_sets_to_lists(value) for key, value in obj.items()}
-        else:
-            return obj
-    
-    # Convert all sets in the log to lists for JSON serialization
-    serializable_log = convert_sets_to_lists(log)
-    
-    # Save log with custom encoder for any remaining sets
-    with open(log_path, 'w') as f:
-        json.dump(serializable_log, f, indent=2, cls=SetEncoder)
+    # Serialize in a single pass; sets are converted on the fly by _json_default
+    if orjson is not None:
+        with open(log_path, 'wb') as f:
+            f.write(orjson.dumps(log, default=_json_default, option=orjson.OPT_INDENT_2))
+    else:
+        with open(log_path, 'w') as f:
+            json.dump(log, f, indent=2, default=_json_default)
     
     print(f"Log saved to {log_path}")
     return log_path
 
+def _run_one(testcase_path, testcase):
+    """Process pool worker: run a single preloaded testcase and return its log."""
+    return run_testcase(testcase_path, testcase=testcase)
+
+def _load_and_validate(testcase_path):
+    """Thread pool worker: read and validate a testcase file."""
+    return validate_testcase(load_testcase(testcase_path))
+
 def run_all_testcases():
     """Run all testcases in the testcases directory."""
     testcases_dir = os.path.join(os.path.dirname(__file__), 'testcases')
     categories = ['small_map', 'medium_map', 'large_map']
     
+    # Collect (testcase_path, output_dir) jobs across all categories
+    jobs = []
     for category in categories:
         category_dir = os.path.join(testcases_dir, category)
-        output_dir = os.path.join(testcases_dir, category, 'results')
         
-        if not os.path.exists(category_dir):
+        # Get all JSON files in the category directory; scandir entries carry their own type info
+        try:
+            with os.scandir(category_dir) as it:
+                testcases = [e.path for e in it if e.name.endswith('.json') and e.is_file()]
+        except FileNotFoundError:
             print(f"Directory {category_dir} does not exist, skipping...")
             continue
         
-        # Get all JSON files in the category directory
-        testcases = [f for f in os.listdir(category_dir) if f.endswith('.json')]
+        # Create the results directory once per category rather than on every save
+        output_dir = os.path.join(category_dir, 'results')
+        os.makedirs(output_dir, exist_ok=True)
+        
+        for testcase_path in testcases:
+            jobs.append((testcase_path, output_dir))
+    
+    # Load and validate every testcase up front, overlapping the file reads in threads
+    with ThreadPoolExecutor(max_workers=8) as loader:
+        loads = [(path, output_dir, loader.submit(_load_and_validate, path)) for path, output_dir in jobs]
+    
+    configs = []
+    for testcase_path, output_dir, load in loads:
+        try:
+            configs.append((testcase_path, output_dir, load.result()))
+        except Exception as e:
+            print(f"Error loading testcase {os.path.basename(testcase_path)}: {e}")
+    
+    # Testcases share no state, so simulate them in parallel processes
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [(path, output_dir, executor.submit(_run_one, path, config)) for path, output_dir, config in configs]
         
-        for testcase in testcases:
-            testcase_path = os.path.join(category_dir, testcase)
+        for testcase_path, output_dir, future in futures:
+            testcase = os.path.basename(testcase_path)
             print(f"Running testcase: {testcase}")
             
             try:
-                log = run_testcase(testcase_path)
+                log = future.result()
                 save_log(log, output_dir)
             except Exception as e:
                 print(f"Error running testcase {testcase}: {e}")
@@ -197,12 +253,10 @@ def main():
     args = parser.parse_args()
     
     # Set up Python virtual environment if it exists
-    venv_path = os.path.join(os.path.dirname(__file__), '.venv')
-    if os.path.exists(venv_path):
-        print(f"Using Python virtual environment at {venv_path}")
+    if os.path.exists(VENV_PATH) and VENV_SITE_PACKAGES not in sys.path:
+        print(f"Using Python virtual environment at {VENV_PATH}")
         # Add the virtual environment's site-packages to sys.path
-        venv_site_packages = os.path.join(venv_path, 'lib', f'python{sys.version_info.major}.{sys.version_info.minor}', 'site-packages')
-        sys.path.insert(0, venv_site_packages)
+        sys.path.insert(0, VENV_SITE_PACKAGES)
     
     if args.all:
         run_all_testcases()
@@ -213,6 +267,7 @@ def main():
             
         testcase_dir = os.path.dirname(args.testcase)
         output_dir = os.path.join(testcase_dir, 'results')
+        os.makedirs(output_dir, exist_ok=True)
         log = run_testcase(args.testcase)
         save_log(log, output_dir)
     else:
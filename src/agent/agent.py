@@ -1,4 +1,5 @@
 # src/agent/agent.py
+from collections import deque
 
 from .inference_module import InferenceModule 
 from .pathfinding_module import PathfindingModule # Class name changed
@@ -6,8 +7,16 @@ from .planning_module import StrategicPlanner    # New strategic module
 from .agent_goal import AgentGoal                # Enum in a separate file
 
 
-from utils.constants import N_DEFAULT, K_DEFAULT, PERCEPT_GLITTER, ACTION_MOVE_FORWARD, ACTION_TURN_LEFT, ACTION_TURN_RIGHT, ACTION_SHOOT, ACTION_GRAB, ACTION_CLIMB_OUT, DIRECTIONS, EAST, WUMPUS_MOVE_INTERVAL
+from utils.constants import N_DEFAULT, K_DEFAULT, PERCEPT_GLITTER_BIT, PERCEPT_BITS, ACTION_MOVE_FORWARD, ACTION_TURN_LEFT, ACTION_TURN_RIGHT, ACTION_SHOOT, ACTION_GRAB, ACTION_CLIMB_OUT, DIRECTIONS, DIR_INDEX, DIR_MASK, EAST, WUMPUS_MOVE_INTERVAL
 
+# Direction deltas by DIR_INDEX, for plan simulation.
+_DELTAS = tuple(DIRECTIONS)
+
+# Direction-index offset applied by each turning action while simulating a plan.
+_TURN_OFFSETS = {ACTION_TURN_LEFT: -1, ACTION_TURN_RIGHT: 1}
+
+# Plan actions with preconditions that _simulate_first_forward_dest must check.
+_SPECIAL_ACTIONS = frozenset((ACTION_SHOOT, ACTION_CLIMB_OUT))
 
 class WumpusWorldAgent:
     """
@@ -27,14 +36,22 @@ class WumpusWorldAgent:
 
         # Physical state of the agent
         self.agent_pos, self.agent_dir = (0, 0), EAST
+        # agent_pos and agent_dir unpacked once per sync, for the per-step plan simulation.
+        self.agent_x, self.agent_y, self.agent_dir_idx = 0, 0, DIR_INDEX[EAST]
         self.agent_has_gold, self.agent_has_arrow = False, True
         self.score = 0
         self.actions_in_current_epoch = 0
 
         # Planning and goal state
-        self.path_to_follow = []
+        self.path_to_follow = deque()
+        self._plan_has_specials = False  # Whether path_to_follow contains a SHOOT or CLIMB_OUT
         self.current_goal = AgentGoal.EXPLORE_SAFELY
         self.last_action, self.last_shoot_dir = None, None
+
+        # Plans computed against the current KB version, keyed by goal and agent state.
+        # The KB version only moves when a fact changes, so plans survive uneventful steps.
+        self._plan_cache = {}
+        self._plan_cache_version = None
     
     def increment_epoch_counter(self):
         """Increments the action counter for the current epoch."""
@@ -44,6 +61,8 @@ class WumpusWorldAgent:
         """Synchronizes the agent's internal state with the environment's state."""
         self.agent_pos = env_state["agent_pos"]
         self.agent_dir = env_state["agent_dir"]
+        self.agent_x, self.agent_y = self.agent_pos
+        self.agent_dir_idx = DIR_INDEX[self.agent_dir]
         self.agent_has_gold = env_state["agent_has_gold"]
         self.agent_has_arrow = env_state["agent_has_arrow"]
         self.score = env_state["score"]
@@ -64,43 +83,88 @@ class WumpusWorldAgent:
         if not self.path_to_follow:
             return None
 
-        dir_idx = DIRECTIONS.index(self.agent_dir)
-        pos_x, pos_y = self.agent_pos
+        dir_idx = self.agent_dir_idx
+        pos_x, pos_y = self.agent_x, self.agent_y
+
+        # Most validated plans start with a straight step: no simulation needed.
+        if self.path_to_follow[0] == ACTION_MOVE_FORWARD:
+            dx, dy = _DELTAS[dir_idx]
+            return (pos_x + dx, pos_y + dy)
+
+        # Special actions only matter when their precondition fails: a SHOOT without the arrow,
+        # or a CLIMB_OUT away from (0,0). Those resolve to their status in the same table-driven
+        # loop; every other action that isn't a turn or a move leaves the simulated state alone.
+        invalid_actions = {}
+        if self._plan_has_specials:
+            if not self.agent_has_arrow:
+                invalid_actions[ACTION_SHOOT] = "INVALID_SHOOT"
+            if (pos_x, pos_y) != (0, 0):
+                invalid_actions[ACTION_CLIMB_OUT] = "INVALID_CLIMB"
 
         for action in self.path_to_follow:
-            if action == ACTION_TURN_LEFT:
-                dir_idx = (dir_idx - 1) % len(DIRECTIONS)
-            elif action == ACTION_TURN_RIGHT:
-                dir_idx = (dir_idx + 1) % len(DIRECTIONS)
+            # Turns are the bulk of most plans: resolve them with a single table lookup.
+            turn = _TURN_OFFSETS.get(action)
+            if turn is not None:
+                dir_idx = (dir_idx + turn) & DIR_MASK
             elif action == ACTION_MOVE_FORWARD:
-                d = DIRECTIONS[dir_idx]
-                return (pos_x + d[0], pos_y + d[1])
-            elif action == ACTION_SHOOT:
-                # If the plan requires a shot but we're out of arrows, it's invalid.
-                if not getattr(self, "agent_has_arrow", False):
-                    return "INVALID_SHOOT"
-                # A shoot action doesn't change position, so continue simulation.
-            elif action == ACTION_CLIMB_OUT:
-                # A climb action is only valid at the start.
-                if self.agent_pos != (0,0):
-                    return "INVALID_CLIMB"
-            # Other actions like GRAB don't affect position/direction for this check.
+                dx, dy = _DELTAS[dir_idx]
+                return (pos_x + dx, pos_y + dy)
+            elif action in invalid_actions:
+                return invalid_actions[action]
 
         return None  # No ACTION_MOVE_FORWARD was found in the plan.
 
+    def _set_plan(self, plan):
+        """Replaces the current plan with `plan`, noting whether it contains special actions."""
+        self.path_to_follow = deque(plan)
+        self._plan_has_specials = not _SPECIAL_ACTIONS.isdisjoint(self.path_to_follow)
+
+    def _create_plan(self, goal, actions_in_current_epoch=0):
+        """
+        Returns the strategic planner's plan for `goal`, reusing the result while
+        neither the knowledge base nor the agent's physical state has changed.
+        """
+        kb_version = self.inference_module.kb_version
+        if kb_version != self._plan_cache_version:
+            self._plan_cache.clear()
+            self._plan_cache_version = kb_version
+
+        key = (goal, self.agent_pos, self.agent_dir, self.agent_has_arrow, actions_in_current_epoch)
+        if key not in self._plan_cache:
+            self._plan_cache[key] = self.strategic_planner.create_plan(self, goal, actions_in_current_epoch)
+        return self._plan_cache[key]
+
+    def _pop_planned_action(self):
+        """Takes the next action off the plan, recording the arrow's direction when it is a shot."""
+        action = self.path_to_follow.popleft()
+        if action == ACTION_SHOOT:
+            # The arrow flies the way the agent faces; the next inference cycle uses this
+            # direction to place the kill (on a scream) or to clear the line (on a miss).
+            self.last_shoot_dir = self.agent_dir
+        return action
+
     def decide_action(self, percepts):
         """The main decision-making loop of the agent."""
+        # Bound once: this runs every step and these are read repeatedly below.
+        inference_module = self.inference_module
+        agent_pos = self.agent_pos
+
+        # Pack the percept list into bit flags once; every later percept check is a single AND.
+        percept_bits = 0
+        for percept in percepts:
+            percept_bits |= PERCEPT_BITS[percept]
+
         # Handle epoch transitions at the beginning of a decision cycle.
         if self.is_moving_wumpus_mode and self.actions_in_current_epoch >= WUMPUS_MOVE_INTERVAL:
             # A wumpus movement phase has just occurred. Reset knowledge.
             self.actions_in_current_epoch = 0
-            self.inference_module.on_new_epoch_starts(is_moving_wumpus_mode=True)
+            inference_module.on_new_epoch_starts(is_moving_wumpus_mode=True)
             # print("DEBUG: New epoch started. Knowledge reset.")
 
         # 1. THINK: Update the knowledge base with new information.
-        self.inference_module.update_knowledge(
-            self.agent_pos, 
-            percepts, 
+        inference_module.update_knowledge(
+            agent_pos, 
+            percept_bits, 
             self.last_action, 
             self.last_shoot_dir, 
             self.is_moving_wumpus_mode
@@ -113,84 +177,75 @@ class WumpusWorldAgent:
         if self.path_to_follow:
             # Quick pre-check: if the very first action is SHOOT but we have no arrow, invalidate.
             if self.path_to_follow[0] == ACTION_SHOOT and not self.agent_has_arrow:
-                self.path_to_follow = []
+                self.path_to_follow.clear()
             else:
                 # Simulate to find the destination of the first forward move.
                 dest = self._simulate_first_forward_dest()
 
                 if dest in ["INVALID_SHOOT", "INVALID_CLIMB"]:
                     # Plan depends on a precondition that is no longer met.
-                    self.path_to_follow = []
+                    self.path_to_follow.clear()
                 elif isinstance(dest, tuple):
                     # Ensure the next move's destination is still considered safe.
-                    kb_status = self.inference_module.get_kb_status()
+                    kb_status = inference_module.get_kb_status()
                     if not self.pathfinding_module._is_valid_coord(*dest) or kb_status[dest[0]][dest[1]] == "Dangerous":
                         # The path leads into known danger. Invalidate and force replan.
-                        self.path_to_follow = []
+                        self.path_to_follow.clear()
 
         # 2. REFLEX: Handle high-priority, immediate actions.
         # Grabbing glitter is a non-negotiable, immediate action that overrides any plan.
-        if PERCEPT_GLITTER in percepts:
-            self.path_to_follow = []  
+        if percept_bits & PERCEPT_GLITTER_BIT:
+            self.path_to_follow.clear()  
             self.last_action = ACTION_GRAB
             return self.last_action
 
         if self.agent_has_gold and not self.path_to_follow:
-            path_home = self.strategic_planner.create_plan(self, AgentGoal.RETURN_HOME)
+            path_home = self._create_plan(AgentGoal.RETURN_HOME)
             if path_home:
-                self.path_to_follow = path_home
+                self._set_plan(path_home)
             else:
-                self.last_action = ACTION_CLIMB_OUT if self.agent_pos == (0, 0) else ACTION_TURN_RIGHT
+                self.last_action = ACTION_CLIMB_OUT if agent_pos == (0, 0) else ACTION_TURN_RIGHT
                 return self.last_action
             
         # 3. EXECUTE PLAN: If a valid plan exists, follow it.
         if self.path_to_follow:
-            self.last_action = self.path_to_follow.pop(0)
+            self.last_action = self._pop_planned_action()
             return self.last_action
 
         # 4. DECIDE & RE-PLAN: If there's no active plan, determine a new goal base on curent knowledge and create a plan.
-        self._determine_next_goal()
-        new_path = self.strategic_planner.create_plan(
-            self, 
-            self.current_goal, 
-            self.actions_in_current_epoch
-        )
+        new_path = self._determine_next_goal_and_plan()
 
         if new_path:
-            self.path_to_follow = new_path
-            self.last_action = self.path_to_follow.pop(0)
+            self._set_plan(new_path)
+            self.last_action = self._pop_planned_action()
             return self.last_action
 
         # 5. FALLBACK ACTION
-        self.last_action = ACTION_CLIMB_OUT if self.agent_pos == (0, 0) else ACTION_TURN_RIGHT
+        self.last_action = ACTION_CLIMB_OUT if agent_pos == (0, 0) else ACTION_TURN_RIGHT
         return self.last_action
 
-    def _determine_next_goal(self):
-        """Strategically determines the next high-level goal based on the agent's current state and knowledge."""
-        plan_to_explore = self.strategic_planner.create_plan(
-            self,
-            AgentGoal.EXPLORE_SAFELY,
-            self.actions_in_current_epoch
-        )
+    def _determine_next_goal_and_plan(self):
+        """
+        Strategically determines the next high-level goal based on the agent's current state and knowledge.
+        Sets self.current_goal and returns the plan built while choosing it (possibly None).
+        """
+        plan_to_explore = self._create_plan(AgentGoal.EXPLORE_SAFELY, self.actions_in_current_epoch)
         if plan_to_explore:
             self.current_goal = AgentGoal.EXPLORE_SAFELY
-            return
+            return plan_to_explore
 
-        plan_to_get_unstuck = self.strategic_planner.create_plan(
-            self,
-            AgentGoal.GET_UNSTUCK,
-            self.actions_in_current_epoch
-        )
+        plan_to_get_unstuck = self._create_plan(AgentGoal.GET_UNSTUCK, self.actions_in_current_epoch)
         if plan_to_get_unstuck:
             self.current_goal = AgentGoal.GET_UNSTUCK
-            return
+            return plan_to_get_unstuck
 
         self.current_goal = AgentGoal.ESCAPE
+        return self._create_plan(AgentGoal.ESCAPE, self.actions_in_current_epoch)
 
     def get_known_map(self):
         """Returns the map of definitively known items (Wumpus, Pit, Gold)."""
         return self.inference_module.get_known_map()
 
     def get_kb_status(self):
-        """Returns the map of inferred cell statuses (Safe, Dangerous, etc.)."""
+        """Returns the map of inferred cell statuses (Safe, Dangerous, etc.). This is the live, read-only map, not a copy."""
         return self.inference_module.get_kb_status()
\ No newline at end of file
@@ -1,7 +1,7 @@
 # src/agent/agent_goal.py
-from enum import Enum, auto
+from enum import IntEnum, auto
 
-class AgentGoal(Enum):
+class AgentGoal(IntEnum):
     EXPLORE_SAFELY = auto()
     RETURN_HOME = auto()
     SHOOT_WUMPUS = auto() 
@@ -4,15 +4,17 @@ from collections import deque
 from utils.constants import (
     N_DEFAULT, 
     K_DEFAULT, 
-    PERCEPT_BREEZE, 
-    PERCEPT_GLITTER, 
-    PERCEPT_SCREAM, 
-    PERCEPT_STENCH, 
+    PERCEPT_BREEZE_BIT, 
+    PERCEPT_GLITTER_BIT, 
+    PERCEPT_SCREAM_BIT, 
+    PERCEPT_STENCH_BIT, 
     WUMPUS_SYMBOL, 
     PIT_SYMBOL, 
     GOLD_SYMBOL,
-    ACTION_SHOOT
+    ACTION_SHOOT,
+    DIR_INDEX
 )
+from utils.grid import ray_table
 from .knowledge_base import (
     KnowledgeBase, 
     F_WUMPUS, 
@@ -25,7 +27,9 @@ from .knowledge_base import (
     F_POSSIBLE_PIT, 
     F_HAS_BREEZE, 
     F_HAS_STENCH, 
-    F_DEAD_WUMPUS
+    F_DEAD_WUMPUS,
+    F_VISITED,
+    STATUS_FACTS
 )
 from .rules import (
     Rule, 
@@ -36,13 +40,31 @@ from .rules import (
     GlobalWumpusCountRule
 )
 
+def _classify(facts):
+    """The status of a cell with `facts`, in priority order: Visited, Safe, Dangerous, Unknown."""
+    if facts & F_VISITED:
+        return "Visited"
+    if facts & (F_SAFE | F_DEAD_WUMPUS):
+        return "Safe"
+    if facts & (F_WUMPUS | F_PIT):
+        return "Dangerous"
+    return "Unknown"
+
+# Status of every combination of the status bits, so classifying a cell is one masked lookup.
+_STATUS_BY_FACTS = {
+    facts: _classify(facts)
+    for facts in range(STATUS_FACTS + 1) if not facts & ~STATUS_FACTS
+}
+
 class InferenceEngine:
     """
     Represents the "Logic Processor" or the "Execution Engine".
     """
     def __init__(self, knowledge_base: KnowledgeBase):
         self.kb = knowledge_base
-        
+        # Every arrow path on this board, precomputed, so a shot's cells are a single lookup.
+        self._rays = ray_table(knowledge_base.N)
+
         self.local_rules: list[Rule] = [
             SafetyFromNoThreatsRule(),
             ContradictionRule(),
@@ -52,100 +74,139 @@ class InferenceEngine:
             PitResolutionRule(),
         ]
         self.global_rule = GlobalWumpusCountRule()
+        # (KB version, known Wumpus count) the global rule last saw after its facts were added.
+        # The rule reads nothing else, so while this is unchanged it has nothing new to add.
+        self._global_rule_state = None
+        # One flag per cell (indexed x * N + y): set once the cell has joined the agenda in the
+        # current pass, so it is queued and processed at most once per pass.
+        self._in_agenda = bytearray(knowledge_base.N * knowledge_base.N)
+        # Inputs of the cycles that added nothing at KB version _idle_version. A cycle is
+        # deterministic in the KB and its inputs, so repeating one of them is a no-op.
+        self._idle_cycles = set()
+        self._idle_version = None
+
+    def _enqueue(self, pos, agenda):
+        """Appends `pos` to the agenda unless it has already joined it in this pass."""
+        idx = pos[0] * self.kb.N + pos[1]
+        if not self._in_agenda[idx]:
+            self._in_agenda[idx] = 1
+            agenda.append(pos)
 
     def _add_fact_to_kb(self, pos, fact, agenda, volatile=False):
-        """Helper to add a fact and update the agenda if it's new."""
-        # Check against all facts, but add with the correct volatility.
-        if fact not in self.kb.get_facts(pos):
-            self.kb.add_fact(pos, fact, volatile=volatile)
-            agenda.append(pos)
-            for neighbor in self.kb.get_neighbors(pos):
-                agenda.append(neighbor)
+        """Helper to add a fact (or an OR of facts) and update the agenda if anything is new."""
+        kb = self.kb
+        # The flat index is computed once and used for the fact check and the agenda flags;
+        # the tuple is only handed on to the KB and the agenda.
+        idx = pos[0] * kb.N + pos[1]
+        # Check against all facts, but add the missing ones with the correct volatility.
+        missing = fact & ~(kb.permanent[idx] | kb.volatile[idx])
+        if missing:
+            kb.add_fact(pos, missing, volatile=volatile)
+            in_agenda = self._in_agenda
+            if not in_agenda[idx]:
+                in_agenda[idx] = 1
+                agenda.append(pos)
+            for neighbor, n_idx in zip(kb.get_neighbors(pos), kb.get_neighbor_indices(pos)):
+                if not in_agenda[n_idx]:
+                    in_agenda[n_idx] = 1
+                    agenda.append(neighbor)
 
     # Implement the knowledge reset logic.
     def clear_volatile_knowledge(self, is_moving_wumpus_mode=False):
         """Resets knowledge at the start of a new epoch."""
-        for x in range(self.kb.N):
-            for y in range(self.kb.N):
-                pos = (x, y)
-                # 1. Clear all temporary facts (from no-stench, shot misses, etc.)
-                self.kb.drop_volatile_facts(pos)
-
-                if not is_moving_wumpus_mode:
-                    continue
-
-                # 2. In moving mode, re-evaluate permanent facts
-                permanent_facts = self.kb.kb[self.kb._pos_to_idx(pos)]['permanent']
-
-                # 2a. Demote confirmed Wumpus to possible Wumpus
-                if F_WUMPUS in permanent_facts and F_DEAD_WUMPUS not in permanent_facts:
-                    self.kb.remove_fact(pos, F_WUMPUS)
-                    self.kb.add_fact(pos, F_POSSIBLE_WUMPUS, volatile=True)
-
-                # 2b. A cell's Wumpus-safety is no longer guaranteed, unless a Wumpus there is dead.
-                # This correctly handles (0,0) as well.
-                is_safe_from_wumpus = F_DEAD_WUMPUS in permanent_facts
-                if not is_safe_from_wumpus:
-                    if F_NOT_WUMPUS in permanent_facts:
-                        self.kb.remove_fact(pos, F_NOT_WUMPUS)
-                    if F_SAFE in permanent_facts:
-                        self.kb.remove_fact(pos, F_SAFE)
-
-    def run_inference_cycle(self, current_pos, percepts, last_action=None, last_shoot_dir=None, is_moving_wumpus_mode=True):
+        # 1. Clear all temporary facts (from no-stench, shot misses, etc.) in one reset.
+        self.kb.drop_all_volatile_facts()
+
+        if not is_moving_wumpus_mode:
+            return
+
+        # 2. In moving mode, re-evaluate permanent facts. A single pass over the flat
+        # permanent array leaves cells without such facts untouched.
+        N = self.kb.N
+        permanent = self.kb.permanent
+        for idx in range(N * N):
+            permanent_facts = permanent[idx]
+            if not permanent_facts & (F_WUMPUS | F_NOT_WUMPUS | F_SAFE):
+                continue
+            pos = divmod(idx, N)
+
+            # 2a. Demote confirmed Wumpus to possible Wumpus
+            if permanent_facts & F_WUMPUS and not permanent_facts & F_DEAD_WUMPUS:
+                self.kb.remove_fact(pos, F_WUMPUS)
+                self.kb.add_fact(pos, F_POSSIBLE_WUMPUS, volatile=True)
+
+            # 2b. A cell's Wumpus-safety is no longer guaranteed, unless a Wumpus there is dead.
+            # This correctly handles (0,0) as well.
+            is_safe_from_wumpus = permanent_facts & F_DEAD_WUMPUS
+            if not is_safe_from_wumpus:
+                if permanent_facts & F_NOT_WUMPUS:
+                    self.kb.remove_fact(pos, F_NOT_WUMPUS)
+                if permanent_facts & F_SAFE:
+                    self.kb.remove_fact(pos, F_SAFE)
+
+    def run_inference_cycle(self, current_pos, percept_bits, last_action=None, last_shoot_dir=None, is_moving_wumpus_mode=True):
         """
         # AGENDA-BASED FORWARD-CHAINNING.
         1. Seeds the agenda with initial facts from percepts.
         2. Processes the agenda until it's empty, applying local and relational rules.
         3. Applies global rules once at the end.
         """
+        # Only a cycle that left the KB unchanged is recorded, so a skipped repeat would
+        # have changed nothing either. A scream changes the Wumpus count outside the facts,
+        # so screaming cycles are never recorded.
+        cycle_key = (
+            self.kb.version, self.kb.known_wumpus_count, current_pos, percept_bits,
+            last_shoot_dir if last_action == ACTION_SHOOT else None, is_moving_wumpus_mode
+        )
+        if cycle_key in self._idle_cycles:
+            return
 
-        agenda = deque([current_pos])
+        agenda = deque()
+        self._in_agenda = bytearray(self.kb.N * self.kb.N)
+        self._enqueue(current_pos, agenda)
 
         # Handle Scream (permanent change)
-        if PERCEPT_SCREAM in percepts:
+        if percept_bits & PERCEPT_SCREAM_BIT:
             self._handle_scream_event(current_pos, last_shoot_dir, agenda)
 
         # Handle a missed shot. This provides VOLATILE information.
         elif last_action == ACTION_SHOOT:
             if last_shoot_dir:
-                sx, sy = current_pos
-                dx, dy = last_shoot_dir
-                cx, cy = sx + dx, sy + dy
-                while self.kb._is_valid_coord(cx, cy):
-                    cell_to_clear = (cx, cy)
-                    self._add_fact_to_kb(cell_to_clear, F_NOT_WUMPUS, agenda, volatile=True)
-                    cx += dx
-                    cy += dy
-
-        self._apply_percept_rules(current_pos, percepts, agenda)
+                # Cells already known Wumpus-free are skipped with a bit test, without a helper call.
+                N, permanent, volatile = self.kb.N, self.kb.permanent, self.kb.volatile
+                for cell_to_clear in self._ray_cells(current_pos, last_shoot_dir):
+                    idx = cell_to_clear[0] * N + cell_to_clear[1]
+                    if not (permanent[idx] | volatile[idx]) & F_NOT_WUMPUS:
+                        self._add_fact_to_kb(cell_to_clear, F_NOT_WUMPUS, agenda, volatile=True)
+
+        self._apply_percept_rules(current_pos, percept_bits, agenda)
         
         # Step 2: Process the agenda.
+        # The agenda loop is the engine's hot path; the KB, the helper and the rules it
+        # calls for every processed cell are bound once. Local rules still run first.
+        kb = self.kb
+        add_fact_to_kb = self._add_fact_to_kb
+        rules = (*self.local_rules, *self.relational_rules)
         while True:
             # Process local and relational rules until the agenda is locally stable.
-            processed_this_loop = set()
+            # Cells are deduplicated as they are enqueued, so every popped cell is new to this pass.
             while agenda:
                 pos_to_process = agenda.popleft()
-                if pos_to_process in processed_this_loop:
-                    continue
-                processed_this_loop.add(pos_to_process)
-
-                for rule in self.local_rules:
-                    new_facts = rule.apply(self.kb, pos_to_process)
-                    for pos, fact in new_facts:
-                        self._add_fact_to_kb(pos, fact, agenda)
-                
-                for rule in self.relational_rules:
-                    new_facts = rule.apply(self.kb, pos_to_process)
-                    for pos, fact in new_facts:
-                        self._add_fact_to_kb(pos, fact, agenda)
+                for rule in rules:
+                    for pos, fact in rule.apply(kb, pos_to_process):
+                        add_fact_to_kb(pos, fact, agenda)
+
+            # The global rule's facts start a new pass, in which every cell may be queued again.
+            self._in_agenda = bytearray(self.kb.N * self.kb.N)
 
             # Conditionally apply the global rule.
             # This rule is unsound in a dynamic environment.
-            if not is_moving_wumpus_mode:
+            if not is_moving_wumpus_mode and self._global_rule_state != (self.kb.version, self.kb.known_wumpus_count):
                 # Now that local inference has stabilized, apply the global rule.
                 new_global_facts = self.global_rule.apply(self.kb)
                 for pos, fact in new_global_facts:
                     self._add_fact_to_kb(pos, fact, agenda)
+                self._global_rule_state = (self.kb.version, self.kb.known_wumpus_count)
 
             # If the global rule produced new facts, the agenda is no longer empty,
             # and the outer loop will continue to process their consequences.
@@ -153,31 +214,52 @@ class InferenceEngine:
             if not agenda:
                 break
 
-    def _apply_percept_rules(self, current_pos, percepts, agenda):
-        """Applies direct percept rules and seeds the agenda."""
-        neighbors = self.kb.get_neighbors(current_pos)
-        
-        if PERCEPT_STENCH not in percepts:
-            for n_pos in neighbors: 
-                self._add_fact_to_kb(n_pos, F_NOT_WUMPUS, agenda, volatile=True)
-        else:
-            self._add_fact_to_kb(current_pos, F_HAS_STENCH, agenda, volatile=True)
-            for n_pos in neighbors:
-                 if F_NOT_WUMPUS not in self.kb.get_facts(n_pos):
-                    self._add_fact_to_kb(n_pos, F_POSSIBLE_WUMPUS, agenda, volatile=True)
-
-        if PERCEPT_BREEZE not in percepts:
-            for n_pos in neighbors: self._add_fact_to_kb(n_pos, F_NOT_PIT, agenda, volatile=True)
-        else:
-            self._add_fact_to_kb(current_pos, F_HAS_BREEZE, agenda, volatile=True)
-            for n_pos in neighbors:
-                if F_NOT_PIT not in self.kb.get_facts(n_pos):
-                    self._add_fact_to_kb(n_pos, F_POSSIBLE_PIT, agenda, volatile=True)
-
-        if PERCEPT_GLITTER in percepts:
+        if self.kb.version == cycle_key[0] and not percept_bits & PERCEPT_SCREAM_BIT:
+            if self._idle_version != self.kb.version:
+                self._idle_cycles.clear()
+                self._idle_version = self.kb.version
+            self._idle_cycles.add(cycle_key)
+
+    def _apply_percept_rules(self, current_pos, percept_bits, agenda):
+        """Applies direct percept rules and seeds the agenda. `percept_bits` is an OR of PERCEPT_*_BIT flags."""
+        # Each neighbor paired with its flat index, both from tables built once per board size,
+        # so the neighbor pass below tests the fact arrays directly.
+        neighbors = tuple(zip(self.kb.get_neighbors(current_pos), self.kb.get_neighbor_indices(current_pos)))
+        permanent, volatile = self.kb.permanent, self.kb.volatile
+
+        has_stench = percept_bits & PERCEPT_STENCH_BIT
+        has_breeze = percept_bits & PERCEPT_BREEZE_BIT
+
+        perceived = (F_HAS_STENCH if has_stench else 0) | (F_HAS_BREEZE if has_breeze else 0)
+        if perceived:
+            self._add_fact_to_kb(current_pos, perceived, agenda, volatile=True)
+
+        # One pass over the neighbors. A stench makes every neighbor not proven Wumpus-free a
+        # possible Wumpus, and its absence rules a Wumpus out; the breeze does the same for pits.
+        # Both verdicts are folded into one mask, so each neighbor is updated (and queued) once,
+        # and neighbors that already hold it, as on most revisits, are skipped without a helper call.
+        for n_pos, n_idx in neighbors:
+            facts = permanent[n_idx] | volatile[n_idx]
+            new_facts = 0
+            if not has_stench:
+                new_facts |= F_NOT_WUMPUS
+            elif not facts & F_NOT_WUMPUS:
+                new_facts |= F_POSSIBLE_WUMPUS
+            if not has_breeze:
+                new_facts |= F_NOT_PIT
+            elif not facts & F_NOT_PIT:
+                new_facts |= F_POSSIBLE_PIT
+            if new_facts & ~facts:
+                self._add_fact_to_kb(n_pos, new_facts, agenda, volatile=True)
+
+        if percept_bits & PERCEPT_GLITTER_BIT:
             self._add_fact_to_kb(current_pos, F_GOLD, agenda, volatile=True)
             self.kb.gold_found_at = current_pos
 
+    def _ray_cells(self, origin, direction):
+        """Returns the cells an arrow shot from `origin` in `direction` flies through, nearest first."""
+        return self._rays[origin[0]][origin[1]][DIR_INDEX[direction]]
+
     def _handle_scream_event(self, shooter_pos, shoot_dir, agenda):
         if self.kb.known_wumpus_count == 0:
             return
@@ -187,37 +269,20 @@ class InferenceEngine:
         if not shoot_dir:
             return
 
-        candidates = []
-        unknowns = []
-        
-        cx, cy = shooter_pos
-        cx += shoot_dir[0]; cy += shoot_dir[1]
-
-        while self.kb._is_valid_coord(cx, cy):
-            pos = (cx, cy)
+        # The first candidate along the arrow's path is the kill, so the scan stops there;
+        # failing that, the first cell that could still hold a Wumpus is.
+        dead_wumpus_pos = None
+        for pos in self._ray_cells(shooter_pos, shoot_dir):
             facts = self.kb.get_facts(pos)
             
-            if F_DEAD_WUMPUS not in facts:
-                if F_WUMPUS in facts or F_POSSIBLE_WUMPUS in facts and F_SAFE not in facts:
-                    candidates.append(pos)
-                elif F_NOT_WUMPUS not in facts:
-                    unknowns.append(pos)
-            
-            cx += shoot_dir[0]
-            cy += shoot_dir[1]
-
-        dead_wumpus_pos = None
-        if candidates:
-            dead_wumpus_pos = candidates[0]
-        elif unknowns:
-            dead_wumpus_pos = unknowns[0]
+            if not facts & F_DEAD_WUMPUS:
+                if facts & F_WUMPUS or facts & F_POSSIBLE_WUMPUS and not facts & F_SAFE:
+                    dead_wumpus_pos = pos
+                    break
+                elif not facts & F_NOT_WUMPUS and dead_wumpus_pos is None:
+                    dead_wumpus_pos = pos
         
         if dead_wumpus_pos:
-            facts = self.kb.get_facts(dead_wumpus_pos)
-            
-            facts.discard(F_WUMPUS)
-            facts.discard(F_POSSIBLE_WUMPUS)
-
             self._add_fact_to_kb(dead_wumpus_pos, F_DEAD_WUMPUS, agenda)
             self._add_fact_to_kb(dead_wumpus_pos, F_SAFE, agenda)
             self._add_fact_to_kb(dead_wumpus_pos, F_NOT_WUMPUS, agenda)
@@ -229,34 +294,29 @@ class InferenceEngine:
 
     def _explain_stenches_by_dead(self, dead_pos, agenda):
         """
-        When a Wumpus is confirmed dead, any stench percept in its neighboring
-        visited cells that *cannot* be explained by any other still-possible source
-        should be removed. We consider a grand-neighbor (neighbor of the visited)
-        a potential source unless it is proven F_NOT_WUMPUS or proven dead.
+        When a Wumpus is confirmed dead, re-enqueues each neighboring cell whose stench
+        *cannot* be explained by any other still-possible source, so the rules re-evaluate
+        it. The F_HAS_STENCH fact itself is kept. We consider a grand-neighbor (neighbor of
+        the stenched cell) a potential source unless it is proven F_NOT_WUMPUS or proven dead.
         """
-        for neighbor in self.kb.get_neighbors(dead_pos):
-            facts = self.kb.get_facts(neighbor)
-            if F_HAS_STENCH not in facts:
+        kb = self.kb
+        permanent, volatile = kb.permanent, kb.volatile
+        dead_idx = dead_pos[0] * kb.N + dead_pos[1]
+        for neighbor, n_idx in zip(kb.get_neighbors(dead_pos), kb.get_neighbor_indices(dead_pos)):
+            if not (permanent[n_idx] | volatile[n_idx]) & F_HAS_STENCH:
                 continue
 
-            # Determine if any other adjacent cell (excluding the dead_pos) could still explain the stench.
-            other_potential_source_exists = False
-            for grand_neighbor in self.kb.get_neighbors(neighbor):
-                if grand_neighbor == dead_pos:
-                    continue
-                gn_facts = self.kb.get_facts(grand_neighbor)
-
-                # If grand_neighbor is not proven Wumpus-free and not proven dead, it is still a possible source.
-                if F_NOT_WUMPUS not in gn_facts and F_DEAD_WUMPUS not in gn_facts:
-                    other_potential_source_exists = True
-                    break
+            # Any other adjacent cell (excluding dead_pos) that is neither proven Wumpus-free
+            # nor proven dead could still explain the stench.
+            other_potential_source_exists = any(
+                gn_idx != dead_idx and not (permanent[gn_idx] | volatile[gn_idx]) & (F_NOT_WUMPUS | F_DEAD_WUMPUS)
+                for gn_idx in kb.get_neighbor_indices(neighbor)
+            )
 
-            # If no other potential sources remain, it is safe to remove F_HAS_STENCH.
+            # If no other potential source remains, the stench is explained by the dead Wumpus:
+            # keep the perceived F_HAS_STENCH fact and only re-enqueue the cell for re-evaluation.
             if not other_potential_source_exists:
-                # safer to record an "explained" tag rather than permanently deleting,
-                # but following your original design we remove and re-enqueue for re-eval.
-                facts.remove(F_HAS_STENCH)
-                agenda.append(neighbor)
+                self._enqueue(neighbor, agenda)
 
 
 # This class acts as a facade, so the agent doesn't need to know about the internal changes.
@@ -267,6 +327,15 @@ class InferenceModule:
     def __init__(self, N=N_DEFAULT, K=K_DEFAULT):
         self.kb = KnowledgeBase(N, K)
         self.engine = InferenceEngine(self.kb)
+        # Cells currently classified "Safe" (hence unvisited) and "Unknown", maintained as kb_status changes.
+        self.safe_unvisited: set[tuple[int, int]] = set()
+        self.unknown_cells: set[tuple[int, int]] = {(x, y) for x in range(N) for y in range(N)}
+        self._update_kb_status_map()  # Classify the cells the KB's initial facts touched.
+        # The known map and possible-Wumpus set last built by _refresh_grid_views, and the
+        # KB version they reflect.
+        self._known_map = None
+        self._possible_wumpus = None
+        self._grid_views_version = None
 
     # Add the entry point for epoch transition logic.
     def on_new_epoch_starts(self, is_moving_wumpus_mode=False):
@@ -275,51 +344,92 @@ class InferenceModule:
         self._update_kb_status_map() # Refresh the high-level map after clearing knowledge.
 
     # Accept the mode flag.
-    def update_knowledge(self, current_pos, percepts, last_action=None, last_shoot_dir=None, is_moving_wumpus_mode=False):
+    def update_knowledge(self, current_pos, percept_bits, last_action=None, last_shoot_dir=None, is_moving_wumpus_mode=False):
+        """Folds a step's percepts, given as an OR of PERCEPT_*_BIT flags, into the KB."""
         self.kb.mark_visited(current_pos)
-        self.engine.run_inference_cycle(current_pos, percepts, last_action, last_shoot_dir, is_moving_wumpus_mode)
+        self.engine.run_inference_cycle(current_pos, percept_bits, last_action, last_shoot_dir, is_moving_wumpus_mode)
         self._update_kb_status_map()
     
     def _update_kb_status_map(self):
-        for x in range(self.kb.N):
-            for y in range(self.kb.N):
-                pos = (x, y)
-                if self.kb.visited[x][y]:
-                    self.kb.kb_status[x][y] = "Visited"
-                    continue
-                facts = self.kb.get_facts(pos)
-                if F_SAFE in facts or F_DEAD_WUMPUS in facts:
-                    self.kb.kb_status[x][y] = "Safe"
-                elif (F_WUMPUS in facts and F_DEAD_WUMPUS not in facts) or F_PIT in facts:
-                    self.kb.kb_status[x][y] = "Dangerous"
-                else:
-                    self.kb.kb_status[x][y] = "Unknown"
+        # A cell's status depends only on its own STATUS_FACTS, so only the cells the KB
+        # reports as having changed them since the last refresh are re-classified.
+        N = self.kb.N
+        kb_status = self.kb.kb_status
+        permanent, volatile = self.kb.permanent, self.kb.volatile
+        safe_unvisited, unknown_cells = self.safe_unvisited, self.unknown_cells
+        dirty_cells = self.kb.dirty_cells
+        for pos in dirty_cells:
+            x, y = pos
+            idx = x * N + y
+            status = kb_status[x][y] = _STATUS_BY_FACTS[(permanent[idx] | volatile[idx]) & STATUS_FACTS]
+            if status == "Safe":
+                safe_unvisited.add(pos)
+            else:
+                safe_unvisited.discard(pos)
+            if status == "Unknown":
+                unknown_cells.add(pos)
+            else:
+                unknown_cells.discard(pos)
+        dirty_cells.clear()
+
+    def rebuild_kb_status_map(self):
+        """
+        Re-classifies every cell, not just the changed ones. Normal play only needs the
+        incremental refresh; this full recompute is the reference it must agree with.
+        """
+        N = self.kb.N
+        self.kb.dirty_cells.update((x, y) for x in range(N) for y in range(N))
+        self._update_kb_status_map()
+
+    @property
+    def kb_version(self):
+        """Changes only when the KB's facts or visited cells change, so callers can tell when derived results are stale."""
+        return self.kb.version
 
     def get_kb_status(self):
+        """Returns the KB's live status grid, not a copy. It is updated in place; callers must treat it as read-only."""
         return self.kb.kb_status
 
     def get_visited_cells(self):
+        """Returns the KB's live visited grid, not a copy. It is updated in place; callers must treat it as read-only."""
         return self.kb.visited
-    
+
+    def _refresh_grid_views(self):
+        """
+        Rebuilds the known map and the possible-Wumpus set together, in one pass over the
+        facts, if the KB version has moved since they were last built.
+        """
+        if self._grid_views_version == self.kb.version:
+            return
+        N = self.kb.N
+        known_map = [[set() for _ in range(N)] for _ in range(N)]
+        possible_wumpus = set()
+        for idx, facts in enumerate(self.kb.get_all_facts()):
+            if not facts & (F_VISITED | F_NOT_WUMPUS | F_WUMPUS):
+                possible_wumpus.add(divmod(idx, N))
+            # Most cells hold none of the mapped facts; they are skipped with a single AND.
+            if not facts & (F_WUMPUS | F_PIT | F_GOLD):
+                continue
+            r, c = divmod(idx, N)
+            if facts & F_WUMPUS and not facts & F_DEAD_WUMPUS:
+                known_map[r][c].add(WUMPUS_SYMBOL)                
+            if facts & F_PIT: 
+                known_map[r][c].add(PIT_SYMBOL)
+            if facts & F_GOLD: 
+                known_map[r][c].add(GOLD_SYMBOL)
+        self._known_map, self._possible_wumpus = known_map, possible_wumpus
+        self._grid_views_version = self.kb.version
+
     def get_known_map(self):
-        known_map = [[set() for _ in range(self.kb.N)] for _ in range(self.kb.N)]
-        for r in range(self.kb.N):
-            for c in range(self.kb.N):
-                facts = self.kb.get_facts((r, c))
-                if F_WUMPUS in facts and F_DEAD_WUMPUS not in facts:
-                    known_map[r][c].add(WUMPUS_SYMBOL)                
-                if F_PIT in facts: 
-                    known_map[r][c].add(PIT_SYMBOL)
-                if F_GOLD in facts: 
-                    known_map[r][c].add(GOLD_SYMBOL)
-        return known_map
+        """
+        Returns the map of definitively known items. The map is rebuilt only when the KB
+        version has moved since the last call; callers must treat it as read-only.
+        """
+        self._refresh_grid_views()
+        return self._known_map
     
     @property
     def possible_wumpus(self):
-        possible = set()
-        for x in range(self.kb.N):
-            for y in range(self.kb.N):
-                facts = self.kb.get_facts((x,y))
-                if not self.kb.visited[x][y] and F_NOT_WUMPUS not in facts and F_WUMPUS not in facts:
-                    possible.add((x, y))
-        return possible
\ No newline at end of file
+        """Unvisited cells not yet ruled in or out as a Wumpus. Cached like get_known_map; read-only."""
+        self._refresh_grid_views()
+        return self._possible_wumpus
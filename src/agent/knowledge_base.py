@@ -1,13 +1,26 @@
 # src/agent/knowledge_base.py
 
-from utils.constants import N_DEFAULT, K_DEFAULT, DIRECTIONS
+from array import array
+from operator import or_
+
+from utils.constants import N_DEFAULT, K_DEFAULT
+from utils.grid import neighbor_table, neighbor_index_table
 
 # --- Fact Constants ---
-F_WUMPUS, F_PIT, F_GOLD, F_SAFE = "W", "P", "G", "S"
-F_NOT_WUMPUS, F_NOT_PIT = "-W", "-P"
-F_POSSIBLE_WUMPUS, F_POSSIBLE_PIT = "W?", "P?"
-F_HAS_STENCH, F_HAS_BREEZE = "HasStench", "HasBreeze"
-F_DEAD_WUMPUS = "DeadW"
+# Each fact is a single bit, so all of a cell's facts pack into one int and testing
+# for a fact is a single AND.
+F_WUMPUS, F_PIT, F_GOLD, F_SAFE = 1 << 0, 1 << 1, 1 << 2, 1 << 3
+F_NOT_WUMPUS, F_NOT_PIT = 1 << 4, 1 << 5
+F_POSSIBLE_WUMPUS, F_POSSIBLE_PIT = 1 << 6, 1 << 7
+F_HAS_STENCH, F_HAS_BREEZE = 1 << 8, 1 << 9
+F_DEAD_WUMPUS = 1 << 10
+# Mirrors the visited grid inside the permanent facts, so code that already holds a cell's
+# facts can tell whether it was visited without a second lookup.
+F_VISITED = 1 << 11
+
+# The only facts a cell's kb_status depends on. Changes to other facts (percepts, the
+# "possible"/"not" facts) leave the status as it is, so they don't mark the cell dirty.
+STATUS_FACTS = F_VISITED | F_SAFE | F_DEAD_WUMPUS | F_WUMPUS | F_PIT
 
 class KnowledgeBase:
     """
@@ -19,63 +32,114 @@ class KnowledgeBase:
         self.initial_wumpus_count = K
         self.known_wumpus_count = K
         self.gold_found_at = None
+        # Incremented whenever a fact or the visited map actually changes.
+        self.version = 0
+        # Cells whose STATUS_FACTS changed since the status map was last refreshed.
+        self.dirty_cells: set[tuple[int, int]] = set()
 
-        # Each cell now has two sets: one for permanent facts and one for volatile facts.
-        self.kb: list[list[dict[str, set]]] = [
-            {'permanent': set(), 'volatile': set()} for _ in range(self.N * self.N)
-        ]
+        # Each cell has two fact bitmasks, one for permanent facts and one for volatile facts,
+        # kept in two flat arrays indexed by _pos_to_idx. Every F_* bit fits in 16 bits, so
+        # each array is one contiguous buffer of unsigned shorts rather than a list of ints.
+        self.permanent: array = array("H", [0]) * (self.N * self.N)
+        self.volatile: array = array("H", [0]) * (self.N * self.N)
         self.kb_status: list[list[str]] = [["Unknown" for _ in range(self.N)] for _ in range(self.N)]
-        self.visited: list[list[bool]] = [[False for _ in range(self.N)] for _ in range(self.N)]
+        # One byte per cell (1 once visited), in rows indexed visited[x][y]. The F_VISITED fact
+        # is what the engine reads; this grid is kept for get_visited_cells.
+        self.visited: list[bytearray] = [bytearray(self.N) for _ in range(self.N)]
+
+        # The grid never changes size, so every cell's in-bounds neighbors come from a table
+        # computed once per board size.
+        self._neighbors = neighbor_table(self.N)
+        # The same neighbors as flat indices into the fact arrays.
+        self._neighbor_indices = neighbor_index_table(self.N)
 
         # --- Initial Knowledge ---
-        # Start cell is safe. These are permanent facts.
-        self.add_fact((0, 0), F_NOT_PIT, volatile=False)
-        self.add_fact((0, 0), F_NOT_WUMPUS, volatile=False)
-        self.add_fact((0, 0), F_SAFE, volatile=False)
+        # Start cell is safe. These are permanent facts, set with a single OR.
+        self.add_fact((0, 0), F_NOT_PIT | F_NOT_WUMPUS | F_SAFE, volatile=False)
         self.kb_status[0][0] = "Safe"
 
     def _pos_to_idx(self, pos: tuple[int, int]) -> int:
+        # The KB's own hot methods inline this as pos[0] * self.N + pos[1].
         return pos[0] * self.N + pos[1]
 
-    def add_fact(self, pos: tuple[int, int], fact: str, volatile: bool = False):
-        """Adds a fact to the KB for a specific cell, marking it as volatile if necessary."""
-        key = 'volatile' if volatile else 'permanent'
-        self.kb[self._pos_to_idx(pos)][key].add(fact)
+    def add_fact(self, pos: tuple[int, int], fact: int, volatile: bool = False):
+        """Adds a fact (or an OR of facts) to the KB for a specific cell, marking it as volatile if necessary."""
+        facts = self.volatile if volatile else self.permanent
+        idx = pos[0] * self.N + pos[1]
+        added = fact & ~facts[idx]
+        if added:
+            facts[idx] |= fact
+            self.version += 1
+            if added & STATUS_FACTS:
+                self.dirty_cells.add(pos)
+
+    def get_facts(self, pos: tuple[int, int]) -> int:
+        """Retrieves the combined bitmask of all known facts (permanent and volatile) for a cell."""
+        idx = pos[0] * self.N + pos[1]
+        return self.permanent[idx] | self.volatile[idx]
 
-    def get_facts(self, pos: tuple[int, int]) -> set[str]:
-        """Retrieves a combined set of all known facts (permanent and volatile) for a cell."""
-        idx = self._pos_to_idx(pos)
-        return self.kb[idx]['permanent'].union(self.kb[idx]['volatile'])
+    def get_all_facts(self) -> list[int]:
+        """
+        Returns every cell's combined fact bitmask in one flat list indexed like _pos_to_idx,
+        so a query over the whole grid is a single pass; divmod(idx, N) recovers (x, y).
+        """
+        return list(map(or_, self.permanent, self.volatile))
 
-    def remove_fact(self, pos: tuple[int, int], fact: str):
+    def has_fact(self, pos: tuple[int, int], fact: int) -> bool:
+        """Checks whether a cell holds a fact."""
+        idx = pos[0] * self.N + pos[1]
+        return bool((self.permanent[idx] | self.volatile[idx]) & fact)
+
+    def remove_fact(self, pos: tuple[int, int], fact: int):
         """Removes a fact from both permanent and volatile storage to ensure cleanliness."""
-        idx = self._pos_to_idx(pos)
-        self.kb[idx]['permanent'].discard(fact)
-        self.kb[idx]['volatile'].discard(fact)
+        idx = pos[0] * self.N + pos[1]
+        for facts in (self.permanent, self.volatile):
+            removed = facts[idx] & fact
+            if removed:
+                facts[idx] &= ~fact
+                self.version += 1
+                if removed & STATUS_FACTS:
+                    self.dirty_cells.add(pos)
 
     def drop_volatile_facts(self, pos: tuple[int, int]):
         """Clears all volatile facts for a cell. This is called at the end of an epoch."""
-        self.kb[self._pos_to_idx(pos)]['volatile'].clear()
+        idx = pos[0] * self.N + pos[1]
+        dropped = self.volatile[idx]
+        if dropped:
+            self.volatile[idx] = 0
+            self.version += 1
+            if dropped & STATUS_FACTS:
+                self.dirty_cells.add(pos)
+
+    def drop_all_volatile_facts(self):
+        """
+        Clears the volatile facts of every cell at once, as drop_volatile_facts would cell by
+        cell. The array is reset in one slice assignment; only cells that lose a STATUS_FACTS
+        bit are marked dirty.
+        """
+        volatile = self.volatile
+        if not any(volatile):
+            return
+        N = self.N
+        self.dirty_cells.update(divmod(idx, N) for idx, facts in enumerate(volatile) if facts & STATUS_FACTS)
+        volatile[:] = array("H", [0]) * len(volatile)
+        self.version += 1
 
     def mark_visited(self, pos: tuple[int, int]):
         """Marks a cell as visited. A visited cell is permanently safe."""
         x, y = pos
-        if not self.visited[x][y]:
-            self.visited[x][y] = True
+        if not self.permanent[x * self.N + y] & F_VISITED:
+            self.visited[x][y] = 1
             self.kb_status[x][y] = "Visited"
-            # Facts derived from visiting are permanent.
-            self.add_fact(pos, F_SAFE, volatile=False)
-            self.add_fact(pos, F_NOT_WUMPUS, volatile=False)
-            self.add_fact(pos, F_NOT_PIT, volatile=False)
+            self.version += 1
+            self.dirty_cells.add(pos)
+            # Facts derived from visiting are permanent; they are set with a single OR.
+            self.add_fact(pos, F_VISITED | F_SAFE | F_NOT_WUMPUS | F_NOT_PIT, volatile=False)
 
-    def _is_valid_coord(self, x: int, y: int) -> bool:
-        return 0 <= x < self.N and 0 <= y < self.N
+    def get_neighbors(self, pos: tuple[int, int]) -> tuple[tuple[int, int], ...]:
+        """Returns the in-bounds neighbors of a cell, in DIRECTIONS order, from the precomputed table."""
+        return self._neighbors[pos[0]][pos[1]]
 
-    def get_neighbors(self, pos: tuple[int, int]) -> list[tuple[int, int]]:
-        x, y = pos
-        neighbors = []
-        for dx, dy in DIRECTIONS:
-            nx, ny = x + dx, y + dy
-            if self._is_valid_coord(nx, ny):
-                neighbors.append((nx, ny))
-        return neighbors
\ No newline at end of file
+    def get_neighbor_indices(self, pos: tuple[int, int]) -> tuple[int, ...]:
+        """Returns the flat fact-array indices of get_neighbors(pos), in the same order."""
+        return self._neighbor_indices[pos[0]][pos[1]]
@@ -1,6 +1,7 @@
 # src/agent/pathfinding_module.py
 import heapq
-from utils.constants import (DIRECTIONS, ACTION_MOVE_FORWARD, ACTION_TURN_LEFT, ACTION_TURN_RIGHT, SCORE_MOVE_FORWARD, SCORE_TURN, RISK_DANGEROUS, RISK_UNKNOWN, RISK_VISITED_SOFT)
+from utils.grid import neighbor_table, forward_table
+from utils.constants import (DIRECTIONS, DIR_INDEX, DIR_MASK, ACTION_MOVE_FORWARD, ACTION_TURN_LEFT, ACTION_TURN_RIGHT, SCORE_MOVE_FORWARD, SCORE_TURN, RISK_DANGEROUS, RISK_UNKNOWN, RISK_VISITED_SOFT)
 
 class PathfindingModule:
     """
@@ -15,6 +16,10 @@ class PathfindingModule:
             N (int): The size of the N x N grid.
         """
         self.N = N
+        # Per-board-size tables shared with the KB: every cell's in-bounds neighbors, and the
+        # cell one step ahead of it in each direction (by DIR_INDEX), or None at a wall.
+        self._neighbors = neighbor_table(N)
+        self._forward_cells = forward_table(N)
 
     def _is_valid_coord(self, x, y):
         """
@@ -84,46 +89,151 @@ class PathfindingModule:
             list[str] or None: A list of actions (e.g., ['MoveForward', 'TurnRight'])
                                representing the path, or None if no path is found.
         """
+        # _get_heuristic_cost with the goal bound once; _search memoizes it per cell.
+        goal_x, goal_y = goal_pos
+        heuristic = lambda pos: abs(pos[0] - goal_x) + abs(pos[1] - goal_y)
+        for current_pos, trail in self._search(
+            start_pos, start_dir, kb_status, heuristic,
+            avoid_dangerous, is_moving_wumpus_mode, actions_left_in_epoch
+        ):
+            # If the current position is the goal, we have found the path.
+            if current_pos == goal_pos:
+                return self._unwind(trail)
+
+        # If the search is exhausted and the goal was not reached, no path exists.
+        return None
+
+    def find_reachable_cells(self, start_pos, kb_status, avoid_dangerous=True, targets=None):
+        """
+        Flood-fills the grid from start_pos and returns the set of cells find_path
+        can reach. Turning is always possible, so a cell is reachable exactly when
+        it connects to the start through cells the search is allowed to enter.
+
+        If `targets` (a sequence of cells in order of preference) is given, the fill
+        stops early once the first target or every target has been reached, so the
+        result is only complete enough to pick the first reachable target.
+        """
+        reachable = {start_pos}
+        frontier = [start_pos]
+        pending = set(targets) - reachable if targets else None
+        if targets and (not pending or targets[0] == start_pos):
+            return reachable
+        while frontier:
+            x, y = frontier.pop()
+            for neighbor in self._neighbors[x][y]:
+                if neighbor in reachable:
+                    continue
+                if avoid_dangerous and kb_status[neighbor[0]][neighbor[1]] == "Dangerous":
+                    continue
+                reachable.add(neighbor)
+                frontier.append(neighbor)
+                if pending is not None and neighbor in pending:
+                    pending.discard(neighbor)
+                    if not pending or neighbor == targets[0]:
+                        return reachable
+        return reachable
+
+    def find_paths_to_all(
+        self,
+        start_pos,
+        start_dir,
+        goal_positions,
+        kb_status,
+        avoid_dangerous=True,
+        is_moving_wumpus_mode=False,
+        actions_left_in_epoch=5
+    ):
+        """
+        Runs a single Dijkstra search from the start and collects an optimal path
+        to every reachable goal, instead of one A* search per goal.
+
+        Args are the same as find_path, except goal_positions is an iterable of (x, y).
+
+        Returns:
+            dict: Maps each reachable goal (x, y) to its list of actions.
+                  Unreachable goals are absent.
+        """
+        remaining = set(goal_positions)
+        paths = {}
+        if not remaining:
+            return paths
+        for current_pos, trail in self._search(
+            start_pos, start_dir, kb_status, lambda pos: 0,
+            avoid_dangerous, is_moving_wumpus_mode, actions_left_in_epoch
+        ):
+            # The first time a goal is settled (in any direction) its path is optimal.
+            if current_pos in remaining:
+                paths[current_pos] = self._unwind(trail)
+                remaining.discard(current_pos)
+                if not remaining:
+                    break
+        return paths
+
+    def _search(
+        self,
+        start_pos,
+        start_dir,
+        kb_status,
+        heuristic,
+        avoid_dangerous,
+        is_moving_wumpus_mode,
+        actions_left_in_epoch
+    ):
+        """
+        The shared best-first search behind find_path and find_paths_to_all.
+
+        Yields (position, trail) for every state as it is settled, in order of
+        increasing f_cost; _unwind(trail) turns a trail into its action list.
+        `heuristic(pos)` must not depend on the direction; with a zero heuristic
+        this is Dijkstra's algorithm.
+        """
         # The priority queue (min-heap) stores tuples of:
-        # (f_cost, g_cost, position, direction, action_path)
+        # (f_cost, g_cost, position, direction, trail)
         # f_cost = g_cost + h_cost
+        # A trail is (last_action, parent_trail), or None at the start, so extending a path
+        # is O(1) instead of copying it; only the paths actually returned are unwound.
+        # No two entries tie on (f_cost, g_cost, position, direction), so trails are never compared.
         open_set = []
-        h_cost = self._get_heuristic_cost(start_pos, goal_pos)
-        heapq.heappush(open_set, (h_cost, 0, start_pos, start_dir, []))
+        h_cost = heuristic(start_pos)
+        heapq.heappush(open_set, (h_cost, 0, start_pos, start_dir, None))
 
         # A dictionary to store the lowest g_cost found so far for each state (pos, dir).
         g_costs = {(start_pos, start_dir): 0}
-        # A helper dictionary to quickly get the index of a direction tuple.
-        dir_to_idx = {dir_tuple: i for i, dir_tuple in enumerate(DIRECTIONS)}
+        # The goals are fixed for the whole search, so each cell's heuristic is computed
+        # once and reused every time the cell is relaxed again.
+        h_cache = {start_pos: h_cost}
+        # The risk of entering a cell depends only on its status for the whole search,
+        # so it is computed once per status instead of once per relaxation.
+        risk_by_status = {
+            status: self._calculate_dynamic_risk(status, is_moving_wumpus_mode, actions_left_in_epoch)
+            for status in ("Safe", "Dangerous", "Unknown", "Visited")
+        }
+
+        forward_cells = self._forward_cells
 
         while open_set:
             # Pop the node with the lowest f_cost from the priority queue.
-            _, g_cost, current_pos, current_dir, path = heapq.heappop(open_set)
+            _, g_cost, current_pos, current_dir, trail = heapq.heappop(open_set)
 
             # If we've found a better path to this state already, skip.
             if g_cost > g_costs.get((current_pos, current_dir), float("inf")):
                 continue
 
-            # If the current position is the goal, we have found the path.
-            if current_pos == goal_pos:
-                return path
+            yield current_pos, trail
 
-            current_dir_idx = dir_to_idx[current_dir]
+            current_dir_idx = DIR_INDEX[current_dir]
 
             # --- Explore possible actions from the current state ---
 
             # 1. Try moving forward
-            next_pos = (current_pos[0] + current_dir[0], current_pos[1] + current_dir[1])
-            if self._is_valid_coord(next_pos[0], next_pos[1]):
+            next_pos = forward_cells[current_pos[0]][current_pos[1]][current_dir_idx]
+            if next_pos is not None:
                 cell_status = kb_status[next_pos[0]][next_pos[1]]
 
                 # Check if moving to the next cell is allowed based on risk preference.
                 if not (avoid_dangerous and cell_status == "Dangerous"):
                     # Add a risk penalty to the cost for entering non-safe cells.
-                    risk_cost = 0
-                    risk_cost = self._calculate_dynamic_risk(
-                        cell_status, is_moving_wumpus_mode, actions_left_in_epoch
-                    )
+                    risk_cost = risk_by_status[cell_status]
 
                     new_g_cost = g_cost + abs(SCORE_MOVE_FORWARD) + risk_cost
                     next_state = (next_pos, current_dir)
@@ -131,14 +241,17 @@ class PathfindingModule:
                     # If this is a better path to the next state, update it.
                     if new_g_cost < g_costs.get(next_state, float("inf")):
                         g_costs[next_state] = new_g_cost
-                        h_cost = self._get_heuristic_cost(next_pos, goal_pos)
+                        h_cost = h_cache.get(next_pos)
+                        if h_cost is None:
+                            h_cost = h_cache[next_pos] = heuristic(next_pos)
                         f_cost = new_g_cost + h_cost
-                        heapq.heappush(open_set, (f_cost, new_g_cost, next_pos, current_dir, path + [ACTION_MOVE_FORWARD]))
+                        heapq.heappush(open_set, (f_cost, new_g_cost, next_pos, current_dir, (ACTION_MOVE_FORWARD, trail)))
 
             # 2. & 3. Try turning left and right
             # Turning happens in place, so the position doesn't change, only the direction.
+            current_h_cost = h_cache[current_pos]  # Heuristic is the same for both turns
             for turn_action, turn_change in [(ACTION_TURN_LEFT, -1), (ACTION_TURN_RIGHT, 1)]:
-                new_dir_idx = (current_dir_idx + turn_change + len(DIRECTIONS)) % len(DIRECTIONS)
+                new_dir_idx = (current_dir_idx + turn_change) & DIR_MASK
                 new_dir = DIRECTIONS[new_dir_idx]
 
                 new_g_cost = g_cost + abs(SCORE_TURN)
@@ -147,9 +260,15 @@ class PathfindingModule:
                 # If this is a better path to the next state (same position, new direction), update it.
                 if new_g_cost < g_costs.get(next_state, float("inf")):
                     g_costs[next_state] = new_g_cost
-                    h_cost = self._get_heuristic_cost(current_pos, goal_pos) # Heuristic is the same
-                    f_cost = new_g_cost + h_cost
-                    heapq.heappush(open_set, (f_cost, new_g_cost, current_pos, new_dir, path + [turn_action]))
+                    f_cost = new_g_cost + current_h_cost
+                    heapq.heappush(open_set, (f_cost, new_g_cost, current_pos, new_dir, (turn_action, trail)))
 
-        # If the open_set becomes empty and the goal was not reached, no path exists.
-        return None
\ No newline at end of file
+    @staticmethod
+    def _unwind(trail):
+        """Rebuilds the action list of a search trail, first action first."""
+        path = []
+        while trail is not None:
+            action, trail = trail
+            path.append(action)
+        path.reverse()
+        return path
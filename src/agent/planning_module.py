@@ -2,15 +2,26 @@
 
 from .agent_goal import AgentGoal
 from utils.constants import (
-    ACTION_GRAB, ACTION_SHOOT, ACTION_CLIMB_OUT,
-    ACTION_TURN_LEFT, ACTION_TURN_RIGHT, DIRECTIONS,
-    WUMPUS_MOVE_INTERVAL, ACTION_MOVE_FORWARD
+    ACTION_SHOOT, ACTION_CLIMB_OUT,
+    ACTION_TURN_LEFT, ACTION_TURN_RIGHT, DIRECTIONS, DIR_INDEX, DIR_MASK,
+    WUMPUS_MOVE_INTERVAL, ACTION_MOVE_FORWARD, MAX_EXPLORE_TARGETS
 )
 from .knowledge_base import (
     F_WUMPUS, F_DEAD_WUMPUS, F_POSSIBLE_WUMPUS, 
-    F_HAS_STENCH, F_HAS_BREEZE
+    F_HAS_STENCH, F_HAS_BREEZE, F_VISITED
+)
+import heapq
+
+# Direction-index offset applied by each turning action.
+_TURN_OFFSETS = {ACTION_TURN_LEFT: -1, ACTION_TURN_RIGHT: 1}
+
+# Turns that rotate the agent by (target - current) & DIR_MASK steps clockwise.
+_TURNS_BY_DIFF = (
+    (),
+    (ACTION_TURN_RIGHT,),
+    (ACTION_TURN_RIGHT, ACTION_TURN_RIGHT),
+    (ACTION_TURN_LEFT,),
 )
-import random
 
 class StrategicPlanner:
     """
@@ -20,27 +31,29 @@ class StrategicPlanner:
     def __init__(self, pathfinding_module):
         self.pathfinder = pathfinding_module
 
+        # Goal -> plan builder. Goals without an entry have no plan.
+        self._goal_planners = {
+            AgentGoal.RETURN_HOME: self._plan_return_home,
+            AgentGoal.EXPLORE_SAFELY: self._plan_explore_safely,
+            AgentGoal.GET_UNSTUCK: self._plan_to_get_unstuck,
+            AgentGoal.ESCAPE: self._plan_escape,
+        }
+
     def create_plan(self, agent, goal, actions_in_current_epoch=0):
         """
         The main method that generates a plan based on the agent's current goal and context.
         """
-        actions_left = WUMPUS_MOVE_INTERVAL - actions_in_current_epoch
-
-        if goal == AgentGoal.RETURN_HOME:
-            return self._plan_return_home(agent, actions_left)
-        elif goal == AgentGoal.EXPLORE_SAFELY:
-            return self._plan_explore_safely(agent, actions_left)
-        elif goal == AgentGoal.GET_UNSTUCK:
-            return self._plan_to_get_unstuck(agent, actions_left)
-        elif goal == AgentGoal.ESCAPE:
-            return self._plan_escape(agent, actions_left)
-        return None
+        planner = self._goal_planners.get(goal)
+        if planner is None:
+            return None
+        # kb_status is the live map owned by the KB; fetch it once and share it with the goal's planner.
+        kb_status = agent.inference_module.get_kb_status()
+        return planner(agent, kb_status, WUMPUS_MOVE_INTERVAL - actions_in_current_epoch)
     
-    def _plan_return_home(self, agent, actions_left_in_epoch):
+    def _plan_return_home(self, agent, kb_status, actions_left_in_epoch):
         """Plans a path back to (0,0) to climb out."""
         if agent.agent_pos == (0, 0):
             return [ACTION_CLIMB_OUT]
-        kb_status = agent.inference_module.get_kb_status()
         return self.pathfinder.find_path(
             agent.agent_pos, agent.agent_dir, (0, 0), kb_status,
             avoid_dangerous=False,
@@ -48,34 +61,37 @@ class StrategicPlanner:
             actions_left_in_epoch=actions_left_in_epoch
         )
 
-    def _plan_explore_safely(self, agent, actions_left_in_epoch):
+    def _plan_explore_safely(self, agent, kb_status, actions_left_in_epoch):
         """Plans a path to explore the nearest unvisited safe cells."""
-        kb_status = agent.inference_module.get_kb_status()
-        visited_cells = agent.inference_module.get_visited_cells()
-        safe_unvisited_cells = [(x, y) for x in range(agent.N) for y in range(agent.N) 
-                                if kb_status[x][y] == "Safe" and not visited_cells[x][y]]
+        safe_unvisited_cells = agent.inference_module.safe_unvisited
         
         if not safe_unvisited_cells:
             return None
             
-        safe_unvisited_cells.sort(key=lambda p: abs(p[0] - agent.agent_pos[0]) + abs(p[1] - agent.agent_pos[1]))
+        # Only the nearest few targets are worth an A* search; select them without sorting every cell.
+        # Distances are computed in one comprehension and compared as (distance, cell) tuples, so
+        # equally distant cells are taken in (x, y) order without a key call per cell.
+        ax, ay = agent.agent_pos
+        ranked = heapq.nsmallest(MAX_EXPLORE_TARGETS, [(abs(x - ax) + abs(y - ay), (x, y)) for x, y in safe_unvisited_cells])
+        targets = [cell for _, cell in ranked]
         
-        for target in safe_unvisited_cells:
-            path = self.pathfinder.find_path(
-                agent.agent_pos, agent.agent_dir, target, kb_status,
-                avoid_dangerous=True,
-                is_moving_wumpus_mode=agent.is_moving_wumpus_mode,
-                actions_left_in_epoch=actions_left_in_epoch
-            )
-            if path:
-                return path
-        return None
+        # One flood fill tells which targets can be reached at all, so A* only runs
+        # for the nearest reachable one instead of failing exhaustively on the others.
+        reachable = self.pathfinder.find_reachable_cells(agent.agent_pos, kb_status, avoid_dangerous=True, targets=targets)
+        target = next((t for t in targets if t in reachable), None)
+        if target is None:
+            return None
+        return self.pathfinder.find_path(
+            agent.agent_pos, agent.agent_dir, target, kb_status,
+            avoid_dangerous=True,
+            is_moving_wumpus_mode=agent.is_moving_wumpus_mode,
+            actions_left_in_epoch=actions_left_in_epoch
+        )
 
-    def _plan_escape(self, agent, actions_left_in_epoch):
+    def _plan_escape(self, agent, kb_status, actions_left_in_epoch):
         """The last resort plan: try to get back to (0,0) at all costs."""
         if agent.agent_pos == (0, 0):
             return [ACTION_CLIMB_OUT]
-        kb_status = agent.inference_module.get_kb_status()
         return self.pathfinder.find_path(
             agent.agent_pos, agent.agent_dir, (0, 0), kb_status,
             avoid_dangerous=False,
@@ -83,34 +99,42 @@ class StrategicPlanner:
             actions_left_in_epoch=actions_left_in_epoch
         )
 
-    def _plan_to_get_unstuck(self, agent, actions_left_in_epoch):
+    def _plan_to_get_unstuck(self, agent, kb_status, actions_left_in_epoch):
         """
         The core decision-making function for when the agent is trapped.
         It evaluates options (shooting vs. risky move) and selects the one with the highest utility.
         """
         options = []
         kb = agent.inference_module.kb
-        kb_status = agent.inference_module.get_kb_status()
+
+        # --- 0. COLLECT SHOOT TARGETS AND RISKY MOVE TARGETS ---
+        # The inference module keeps the unknown cells up to date; sorting restores grid order.
+        unknown_cells = sorted(agent.inference_module.unknown_cells)
+        # Each live Wumpus candidate is scored once: a confirmed Wumpus is worth more than a possible one.
+        potential_targets = {}
+        if agent.agent_has_arrow:
+            for idx, facts in enumerate(kb.get_all_facts()):
+                if facts & (F_WUMPUS | F_POSSIBLE_WUMPUS) and not facts & F_DEAD_WUMPUS:
+                    potential_targets[divmod(idx, kb.N)] = 100 if facts & F_WUMPUS else 20
 
         # --- 1. GATHER ALL POSSIBLE SHOOTING OPTIONS ---
         if agent.agent_has_arrow:
-            potential_targets = []
-            for x in range(agent.N):
-                for y in range(agent.N):
-                    facts = kb.get_facts((x, y))
-                    if (F_WUMPUS in facts or F_POSSIBLE_WUMPUS in facts) and F_DEAD_WUMPUS not in facts:
-                        potential_targets.append((x, y))
+            safe_spots_by_target = {
+                target: [n for n in kb.get_neighbors(target) if kb_status[n[0]][n[1]] in ["Safe", "Visited"]]
+                for target in potential_targets
+            }
+            # A single search from the agent yields the path to every shooting spot at once.
+            paths_to_spots = self.pathfinder.find_paths_to_all(
+                agent.agent_pos, agent.agent_dir,
+                {spot for spots in safe_spots_by_target.values() for spot in spots}, kb_status,
+                avoid_dangerous=True,
+                is_moving_wumpus_mode=agent.is_moving_wumpus_mode,
+                actions_left_in_epoch=actions_left_in_epoch
+            )
             
-            for target in potential_targets:
-                neighbors = kb.get_neighbors(target)
-                safe_spots = [n for n in neighbors if kb_status[n[0]][n[1]] in ["Safe", "Visited"]]
+            for target, safe_spots in safe_spots_by_target.items():
                 for spot in safe_spots:
-                    path_to_spot = self.pathfinder.find_path(
-                        agent.agent_pos, agent.agent_dir, spot, kb_status,
-                        avoid_dangerous=True,
-                        is_moving_wumpus_mode=agent.is_moving_wumpus_mode,
-                        actions_left_in_epoch=actions_left_in_epoch
-                    )
+                    path_to_spot = paths_to_spots.get(spot)
                     if path_to_spot is not None:
                         turns = self._calculate_turns_to_face(path_to_spot, agent.agent_dir, spot, target)
                         full_plan = path_to_spot + turns + [ACTION_SHOOT]
@@ -118,19 +142,18 @@ class StrategicPlanner:
                         if agent.is_moving_wumpus_mode and len(full_plan) > actions_left_in_epoch:
                             continue  # This plan is too long, skip it.
 
-                        utility = 100 if F_WUMPUS in kb.get_facts(target) else 20
-                        utility -= len(full_plan) # Cost of actions
+                        utility = potential_targets[target] - len(full_plan) # Cost of actions
                         options.append((utility, "shoot", (target, path_to_spot, turns)))
 
         # --- 2. GATHER ALL RISKY MOVE OPTIONS ---
-        unknown_cells = [(x, y) for x in range(agent.N) for y in range(agent.N) if kb_status[x][y] == "Unknown"]
+        paths_to_unknown = self.pathfinder.find_paths_to_all(
+            agent.agent_pos, agent.agent_dir, unknown_cells, kb_status,
+            avoid_dangerous=False,
+            is_moving_wumpus_mode=agent.is_moving_wumpus_mode,
+            actions_left_in_epoch=actions_left_in_epoch
+        )
         for target in unknown_cells:
-            path = self.pathfinder.find_path(
-                agent.agent_pos, agent.agent_dir, target, kb_status,
-                avoid_dangerous=False,
-                is_moving_wumpus_mode=agent.is_moving_wumpus_mode,
-                actions_left_in_epoch=actions_left_in_epoch
-            )
+            path = paths_to_unknown.get(target)
             if path:
                 threat_score = self._calculate_threat_score(kb, target)
                 utility = -50 - (20 * threat_score) - len(path)
@@ -146,32 +169,13 @@ class StrategicPlanner:
         if not options:
             return None
 
-        options.sort(key=lambda x: x[0], reverse=True)
-        best_option = options[0]
+        # Only the best option is needed; max() keeps the first of equally good options.
+        best_option = max(options, key=lambda x: x[0])
         _, action_type, details = best_option
 
         if action_type == "shoot":
-            wumpus_pos, path_to_spot, turns = details
-            # Use the spot coordinate (the safe spot to shoot from) instead of the last action string
-            if path_to_spot:
-                # The spot is the destination coordinate to shoot from
-                spot = path_to_spot_destination = None
-                # Try to get the spot from the pathfinding logic (should be the target spot)
-                # But since we have it in the loop above, we can pass it as part of details if needed
-                # For now, we assume the spot is the last cell in the path, so we need to simulate the end position
-                # But since the path is a list of actions, not positions, we need to use the spot variable from the loop
-                # So, let's pass spot as part of details in the shoot option above
-                # For now, fallback to agent.agent_pos if not available
-                # This fix assumes spot is available in the closure, otherwise fallback
-                # But the correct fix is to pass spot as part of details in the shoot option
-                # For now, fallback to agent.agent_pos
-                # But the correct fix is below:
-                # target_dir_vec = (wumpus_pos[0] - spot[0], wumpus_pos[1] - spot[1])
-                # But since spot is not available here, fallback:
-                target_dir_vec = (wumpus_pos[0] - agent.agent_pos[0], wumpus_pos[1] - agent.agent_pos[1])
-            else:
-                target_dir_vec = (wumpus_pos[0] - agent.agent_pos[0], wumpus_pos[1] - agent.agent_pos[1])
-            agent.last_shoot_dir = target_dir_vec
+            # The agent records the shooting direction itself when it fires (see WumpusWorldAgent).
+            _, path_to_spot, turns = details
             return path_to_spot + turns + [ACTION_SHOOT]
 
         elif action_type == "move":
@@ -182,40 +186,30 @@ class StrategicPlanner:
 
     def _calculate_turns_to_face(self, path, start_dir, start_pos, target_pos):
         """Helper to calculate the turning actions needed to face a target."""
-        final_dir_idx = DIRECTIONS.index(start_dir)
+        final_dir_idx = DIR_INDEX[start_dir]
         for action in path:
-            if action == ACTION_TURN_LEFT: final_dir_idx = (final_dir_idx - 1 + 4) % 4
-            elif action == ACTION_TURN_RIGHT: final_dir_idx = (final_dir_idx + 1) % 4
+            turn = _TURN_OFFSETS.get(action)
+            if turn is not None:
+                final_dir_idx = (final_dir_idx + turn) & DIR_MASK
         
-        final_dir = DIRECTIONS[final_dir_idx]
-        target_dir_vec = (target_pos[0] - start_pos[0], target_pos[1] - start_pos[1])
-        
-        turns = []
-        if target_dir_vec not in DIRECTIONS: return [] # Should not happen with adjacent cells
+        target_idx = DIR_INDEX.get((target_pos[0] - start_pos[0], target_pos[1] - start_pos[1]))
+        if target_idx is None: return [] # Should not happen with adjacent cells
 
-        target_idx = DIRECTIONS.index(target_dir_vec)
-        current_idx = DIRECTIONS.index(final_dir)
-        
-        diff = (target_idx - current_idx + 4) % 4
-        if diff == 1: turns = [ACTION_TURN_RIGHT]
-        elif diff == 2: turns = [ACTION_TURN_RIGHT, ACTION_TURN_RIGHT]
-        elif diff == 3: turns = [ACTION_TURN_LEFT]
-        
-        return turns
+        return list(_TURNS_BY_DIFF[(target_idx - final_dir_idx) & DIR_MASK])
 
     def _predict_end_cell(self, start_pos, start_dir, path, actions_left):
         """Predicts the agent's location when the epoch ends."""
-        pos, dir_idx = start_pos, DIRECTIONS.index(start_dir)
+        pos, dir_idx = start_pos, DIR_INDEX[start_dir]
         path_cutoff = path[:min(len(path), actions_left)]
         
         for action in path_cutoff:
             if action == ACTION_MOVE_FORWARD:
                 dx, dy = DIRECTIONS[dir_idx]
                 pos = (pos[0] + dx, pos[1] + dy)
-            elif action == ACTION_TURN_LEFT:
-                dir_idx = (dir_idx - 1 + 4) % 4
-            elif action == ACTION_TURN_RIGHT:
-                dir_idx = (dir_idx + 1) % 4
+            else:
+                turn = _TURN_OFFSETS.get(action)
+                if turn is not None:
+                    dir_idx = (dir_idx + turn) & DIR_MASK
         return pos
 
     def _epoch_end_safety_penalty(self, kb, cell):
@@ -224,16 +218,16 @@ class StrategicPlanner:
         penalty = 0
         for neighbor in kb.get_neighbors(cell):
             facts = kb.get_facts(neighbor)
-            if F_POSSIBLE_WUMPUS in facts: penalty += 30
-            if F_HAS_STENCH in facts: penalty += 10
+            if facts & F_POSSIBLE_WUMPUS: penalty += 30
+            if facts & F_HAS_STENCH: penalty += 10
         return penalty
 
     def _calculate_threat_score(self, kb, pos):
         """Calculates a threat score for an unknown cell based on percepts in neighboring cells."""
         score = 0
         for neighbor in kb.get_neighbors(pos):
-            if kb.visited[neighbor[0]][neighbor[1]]:
-                facts = kb.get_facts(neighbor)
-                if F_HAS_STENCH in facts: score += 1
-                if F_HAS_BREEZE in facts: score += 1
+            facts = kb.get_facts(neighbor)
+            if facts & F_VISITED:
+                if facts & F_HAS_STENCH: score += 1
+                if facts & F_HAS_BREEZE: score += 1
         return score
\ No newline at end of file
@@ -1,30 +1,46 @@
 # src/agent/rules.py
 
 from abc import ABC, abstractmethod
+from typing import Optional
 # MODIFIED: Imported new fact constants
-from .knowledge_base import KnowledgeBase, F_WUMPUS, F_PIT, F_SAFE, F_NOT_WUMPUS, F_NOT_PIT, F_HAS_STENCH, F_HAS_BREEZE, F_DEAD_WUMPUS
+from .knowledge_base import KnowledgeBase, F_WUMPUS, F_PIT, F_SAFE, F_NOT_WUMPUS, F_NOT_PIT, F_HAS_STENCH, F_HAS_BREEZE, F_DEAD_WUMPUS, F_VISITED
 
 class Rule(ABC):
     @abstractmethod
-    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], str]]:
+    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], int]]:
         pass
+
+def _sole_possible_source(kb: KnowledgeBase, cell: tuple[int, int], ruled_out: int) -> Optional[tuple[int, int]]:
+    """
+    Unit propagation for the clause "some neighbor of `cell` holds the threat": returns the
+    only neighbor not yet known to hold `ruled_out` (F_NOT_WUMPUS or F_NOT_PIT), or None
+    if there are none or several. The scan stops at the second candidate.
+    """
+    candidate = None
+    for n in kb.get_neighbors(cell):
+        if not kb.get_facts(n) & ruled_out:
+            if candidate is not None:
+                return None
+            candidate = n
+    return candidate
+
 class SafetyFromNoThreatsRule(Rule):
     """A cell is definitively safe if it's known to contain neither a Wumpus NOR a Pit."""
-    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], str]]:
+    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], int]]:
         facts = kb.get_facts(pos)
-        if F_NOT_WUMPUS in facts and F_NOT_PIT in facts:
-            if F_SAFE not in facts:
+        if facts & F_NOT_WUMPUS and facts & F_NOT_PIT:
+            if not facts & F_SAFE:
                 return [(pos, F_SAFE)]
         return []
 
 class ContradictionRule(Rule):
     """A cell cannot contain both a Wumpus and a Pit."""
-    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], str]]:
+    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], int]]:
         new_facts = []
         facts = kb.get_facts(pos)
-        if F_WUMPUS in facts and F_NOT_PIT not in facts:
+        if facts & F_WUMPUS and not facts & F_NOT_PIT:
             new_facts.append((pos, F_NOT_PIT))
-        if F_PIT in facts and F_NOT_WUMPUS not in facts:
+        if facts & F_PIT and not facts & F_NOT_WUMPUS:
             new_facts.append((pos, F_NOT_WUMPUS))
         return new_facts
 
@@ -34,47 +50,30 @@ class WumpusResolutionRule(Rule):
     A stench at a visited cell `pos` is caused by Wumpuses in adjacent cells.
     If we can account for all but one of the neighbors, we can make a new deduction.
     """
-    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], str]]:
+    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], int]]:
         new_facts = []
         pos_facts = kb.get_facts(pos)
 
         # CHECK 1: A stench at 'pos' might resolve an unknown neighbor.
-        if kb.visited[pos[0]][pos[1]] and F_HAS_STENCH in pos_facts:
-            neighbors = kb.get_neighbors(pos)
-            
-            # Find all neighbors that could POSSIBLY be the source of the stench.
+        if pos_facts & F_VISITED and pos_facts & F_HAS_STENCH:
             # A neighbor is a possible source if we haven't proven it's Wumpus-free.
-            potential_sources = [
-                n for n in neighbors
-                if F_NOT_WUMPUS not in kb.get_facts(n)
-            ]
-
             # If, after eliminating safe neighbors, there is only ONE possible source left,
             # then that source MUST be the Wumpus.
-            if len(potential_sources) == 1:
-                the_one = potential_sources[0]
-                # Only add the fact if it's new information.
-                if F_WUMPUS not in kb.get_facts(the_one):
-                    new_facts.append((the_one, F_WUMPUS))
+            the_one = _sole_possible_source(kb, pos, F_NOT_WUMPUS)
+            # Only add the fact if it's new information.
+            if the_one is not None and not kb.has_fact(the_one, F_WUMPUS):
+                new_facts.append((the_one, F_WUMPUS))
 
         # CHECK 2: 'pos' being safe (-W) might help resolve a stench in a neighbor.
         # This logic is for when new information about 'pos' (e.g., it's safe) is learned.
-        if kb.visited[pos[0]][pos[1]] and F_NOT_WUMPUS in pos_facts:
+        if pos_facts & F_VISITED and pos_facts & F_NOT_WUMPUS:
             for neighbor in kb.get_neighbors(pos):
                 # We only care about neighbors that we've visited and perceived a stench in.
-                if kb.visited[neighbor[0]][neighbor[1]] and F_HAS_STENCH in kb.get_facts(neighbor):
+                if kb.get_facts(neighbor) & (F_VISITED | F_HAS_STENCH) == F_VISITED | F_HAS_STENCH:
                     # Now, re-evaluate from the neighbor's perspective.
-                    other_neighbors = kb.get_neighbors(neighbor)
-                    
-                    potential_sources_for_neighbor = [
-                        n for n in other_neighbors
-                        if F_NOT_WUMPUS not in kb.get_facts(n)
-                    ]
-                    
-                    if len(potential_sources_for_neighbor) == 1:
-                        the_one = potential_sources_for_neighbor[0]
-                        if F_WUMPUS not in kb.get_facts(the_one):
-                            new_facts.append((the_one, F_WUMPUS))
+                    the_one = _sole_possible_source(kb, neighbor, F_NOT_WUMPUS)
+                    if the_one is not None and not kb.has_fact(the_one, F_WUMPUS):
+                        new_facts.append((the_one, F_WUMPUS))
                             
         return new_facts
         
@@ -83,61 +82,40 @@ class PitResolutionRule(Rule):
     Applies resolution logic for pits.
     This is perfectly analogous to the WumpusResolutionRule.
     """
-    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], str]]:
+    def apply(self, kb: KnowledgeBase, pos: tuple[int, int]) -> list[tuple[tuple[int, int], int]]:
         new_facts = []
         pos_facts = kb.get_facts(pos)
 
         # CHECK 1: A breeze at 'pos' might resolve an unknown neighbor.
-        if kb.visited[pos[0]][pos[1]] and F_HAS_BREEZE in pos_facts:
-            neighbors = kb.get_neighbors(pos)
-            
-            potential_sources = [
-                n for n in neighbors
-                if F_NOT_PIT not in kb.get_facts(n)
-            ]
-            
-            if len(potential_sources) == 1:
-                the_one = potential_sources[0]
-                if F_PIT not in kb.get_facts(the_one):
-                    new_facts.append((the_one, F_PIT))
+        if pos_facts & F_VISITED and pos_facts & F_HAS_BREEZE:
+            the_one = _sole_possible_source(kb, pos, F_NOT_PIT)
+            if the_one is not None and not kb.has_fact(the_one, F_PIT):
+                new_facts.append((the_one, F_PIT))
 
         # CHECK 2: 'pos' being pit-free (-P) might help resolve a breeze in a neighbor.
-        if F_NOT_PIT in pos_facts:
+        if pos_facts & F_NOT_PIT:
             for neighbor in kb.get_neighbors(pos):
-                if kb.visited[neighbor[0]][neighbor[1]] and F_HAS_BREEZE in kb.get_facts(neighbor):
-                    other_neighbors = kb.get_neighbors(neighbor)
-                    
-                    potential_sources_for_neighbor = [
-                        n for n in other_neighbors
-                        if F_NOT_PIT not in kb.get_facts(n)
-                    ]
-                    
-                    if len(potential_sources_for_neighbor) == 1:
-                        the_one = potential_sources_for_neighbor[0]
-                        if F_PIT not in kb.get_facts(the_one):
-                            new_facts.append((the_one, F_PIT))
+                if kb.get_facts(neighbor) & (F_VISITED | F_HAS_BREEZE) == F_VISITED | F_HAS_BREEZE:
+                    the_one = _sole_possible_source(kb, neighbor, F_NOT_PIT)
+                    if the_one is not None and not kb.has_fact(the_one, F_PIT):
+                        new_facts.append((the_one, F_PIT))
 
         return new_facts
 
 class GlobalWumpusCountRule:
     """ This rule is inherently global and cannot be localized. """
-    def apply(self, kb: KnowledgeBase) -> list[tuple[tuple[int, int], str]]:
-        new_facts = []
-        confirmed_living_wumpuses = []
-        
-        for x in range(kb.N):
-            for y in range(kb.N):
-                pos = (x, y)
-                facts = kb.get_facts(pos)
-                if F_WUMPUS in facts and F_DEAD_WUMPUS not in facts:
-                    confirmed_living_wumpuses.append(pos)
+    def apply(self, kb: KnowledgeBase) -> list[tuple[tuple[int, int], int]]:
+        all_facts = kb.get_all_facts()
+        confirmed_living_wumpuses = {
+            idx for idx, facts in enumerate(all_facts)
+            if facts & F_WUMPUS and not facts & F_DEAD_WUMPUS
+        }
         
-        if len(confirmed_living_wumpuses) == kb.known_wumpus_count:
-            for x in range(kb.N):
-                for y in range(kb.N):
-                    pos = (x, y)
-                    facts = kb.get_facts(pos)
-                    if pos not in confirmed_living_wumpuses and F_NOT_WUMPUS not in facts:
-                        # Instead of kb.add_fact, append to the list to be returned.
-                        new_facts.append((pos, F_NOT_WUMPUS))
-        return new_facts
\ No newline at end of file
+        if len(confirmed_living_wumpuses) != kb.known_wumpus_count:
+            return []
+        # Every Wumpus is accounted for, so no other cell can hold one.
+        # Instead of kb.add_fact, return the list of new facts.
+        return [
+            (divmod(idx, kb.N), F_NOT_WUMPUS) for idx, facts in enumerate(all_facts)
+            if idx not in confirmed_living_wumpuses and not facts & F_NOT_WUMPUS
+        ]
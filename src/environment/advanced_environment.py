@@ -6,7 +6,6 @@ agent actions, every Wumpus moves randomly to one adjacent valid cell.
 
 from .environment import WumpusWorldEnvironment
 from utils.constants import (
-    DIRECTIONS,
     WUMPUS_SYMBOL,
     PIT_SYMBOL,
     SCORE_DIE,
@@ -62,9 +61,6 @@ class AdvancedWumpusWorldEnvironment(WumpusWorldEnvironment):
                     positions.append((x, y))
         return positions
 
-    def _is_inside(self, x, y):
-        return 0 <= x < self.N and 0 <= y < self.N
-
     def _move_wumpuses(self):
         """Move all Wumpuses according to the movement rules described above."""
         current_positions = self._current_wumpus_positions()
@@ -72,24 +68,18 @@ class AdvancedWumpusWorldEnvironment(WumpusWorldEnvironment):
             return
 
         reserved_targets = set()
+        blocking_symbols = {PIT_SYMBOL, WUMPUS_SYMBOL}
 
         for wx, wy in current_positions:
             # Skip if this Wumpus was already moved (cell no longer has a Wumpus)
             if WUMPUS_SYMBOL not in self.game_map[wx][wy]:
                 continue
 
-            candidate_moves = []
-            for dx, dy in DIRECTIONS:  # DIRECTIONS is a list in [N, E, S, W] order
-                nx, ny = wx + dx, wy + dy
-                if not self._is_inside(nx, ny):
-                    continue
-                if PIT_SYMBOL in self.game_map[nx][ny]:
-                    continue
-                if WUMPUS_SYMBOL in self.game_map[nx][ny]:
-                    continue
-                if (nx, ny) in reserved_targets:
-                    continue
-                candidate_moves.append((nx, ny))
+            # Free neighbors in DIRECTIONS order ([N, E, S, W]): no pit, no Wumpus, not already claimed.
+            candidate_moves = [
+                (nx, ny) for nx, ny in self._neighbors[wx][wy]
+                if blocking_symbols.isdisjoint(self.game_map[nx][ny]) and (nx, ny) not in reserved_targets
+            ]
 
             if candidate_moves:
                 new_x, new_y = self._rng.choice(candidate_moves)
@@ -2,15 +2,17 @@
 
 import random
 from environment.map_generator import MapGenerator
+from utils.grid import neighbor_table
 from utils.constants import (
     WUMPUS_SYMBOL,
     PIT_SYMBOL,
     GOLD_SYMBOL,
-    PERCEPT_STENCH,
-    PERCEPT_BREEZE,
-    PERCEPT_GLITTER,
     PERCEPT_BUMP,
-    PERCEPT_SCREAM,
+    PERCEPT_STENCH_BIT,
+    PERCEPT_BREEZE_BIT,
+    PERCEPT_GLITTER_BIT,
+    PERCEPT_SCREAM_BIT,
+    PERCEPTS_BY_BITS,
     ACTION_MOVE_FORWARD,
     ACTION_TURN_LEFT,
     ACTION_TURN_RIGHT,
@@ -36,12 +38,13 @@ from utils.constants import (
 
 
 class WumpusWorldEnvironment:
-    def __init__(self, N, K, p):
+    def __init__(self, N, K, p, game_map=None):
         self.N = N
         self.K = K
         self.p = p
         self.map_generator = MapGenerator(N, K, p)
         self.game_map = None  # The true, hidden map of the world
+        self._preset_map = game_map  # Predefined map to use instead of generating one
         self.agent_pos = (0, 0)
         self.agent_dir_idx = 1  # Start facing East (index 1 in DIRECTIONS)
         self.agent_has_gold = False
@@ -50,12 +53,17 @@ class WumpusWorldEnvironment:
         self.game_state = GAME_STATE_PLAYING
         self.last_percepts = []
         self.scream_heard_this_turn = False  # Tracks if a scream should be perceived
+        self.state_version = 0  # Incremented whenever apply_action processes an action
 
         self._initialize_game()
 
     def _initialize_game(self):
         """Sets up a new game board and resets all state variables."""
-        self.game_map = self.map_generator.generate_map()
+        if self._preset_map is not None:
+            # A map given to the constructor is used once, so no random map is built and discarded.
+            self.game_map, self._preset_map = self._preset_map, None
+        else:
+            self.game_map = self.map_generator.generate_map()
         self.agent_pos = (0, 0)
         self.agent_dir_idx = 1  # East
         self.agent_has_gold = False
@@ -65,35 +73,41 @@ class WumpusWorldEnvironment:
         self.last_percepts = []
         self.scream_heard_this_turn = False
 
+    @property
+    def _neighbors(self):
+        """
+        In-bounds neighbors of every cell of the installed map, in DIRECTIONS order. The table
+        follows the map actually in place, since subclasses may install one of another size.
+        """
+        return neighbor_table(len(self.game_map))
+
     def get_percepts(self):
         """
         Gathers all percepts for the agent's current location.
         Percepts include Stench, Breeze, Glitter, Bump, and Scream.
         """
-        percepts = set()
+        percept_bits = 0
         x, y = self.agent_pos
 
         # Check for Glitter if gold is present.
         if GOLD_SYMBOL in self.game_map[x][y]:
-            percepts.add(PERCEPT_GLITTER)
+            percept_bits |= PERCEPT_GLITTER_BIT
 
         # Check for Stench (near Wumpus) and Breeze (near Pit).
-        for dx, dy in DIRECTIONS:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.N and 0 <= ny < self.N:
-                if WUMPUS_SYMBOL in self.game_map[nx][ny]:
-                    percepts.add(PERCEPT_STENCH)
-                if PIT_SYMBOL in self.game_map[nx][ny]:
-                    percepts.add(PERCEPT_BREEZE)
+        for nx, ny in self._neighbors[x][y]:
+            if WUMPUS_SYMBOL in self.game_map[nx][ny]:
+                percept_bits |= PERCEPT_STENCH_BIT
+            if PIT_SYMBOL in self.game_map[nx][ny]:
+                percept_bits |= PERCEPT_BREEZE_BIT
 
         # A scream is perceived in the turn *after* a Wumpus is shot.
         if self.scream_heard_this_turn:
-            percepts.add(PERCEPT_SCREAM)
+            percept_bits |= PERCEPT_SCREAM_BIT
             self.scream_heard_this_turn = False  # Reset after perception
 
         # Bump is added directly by apply_action when a wall is hit.
-        # We convert the set to a list for consistent output.
-        self.last_percepts = list(percepts)
+        # Percepts are gathered as bit flags and expanded to a list of names for consistent output.
+        self.last_percepts = list(PERCEPTS_BY_BITS[percept_bits])
         return self.last_percepts
 
     def _check_game_over(self):
@@ -113,6 +127,7 @@ class WumpusWorldEnvironment:
         if self.game_state != GAME_STATE_PLAYING:
             return "The game is over."
 
+        self.state_version += 1
         message = ""
         # Reset bump percept for this action
         if PERCEPT_BUMP in self.last_percepts:
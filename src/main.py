@@ -109,14 +109,17 @@ def run_simulation(N=N_DEFAULT, K=K_DEFAULT, p=P_DEFAULT, delay=0.3, moving_wump
 
     # Main game loop
     steps_remaining = max_steps
+    synced_version = None  # env.state_version the agent was last synchronized with
     while env.game_state == GAME_STATE_PLAYING and step_count < max_steps:
         step_count += 1
         steps_remaining -= 1
 
         # 1. Agent perceives the environment
         current_percepts = env.get_percepts()
-        env_state = env.get_current_state()
-        agent.update_state(env_state)
+        # The state only changes inside apply_action, so skip the sync if step 5 already did it.
+        if env.state_version != synced_version:
+            agent.update_state(env.get_current_state())
+            synced_version = env.state_version
 
         # 2. Display the world from the agent's perspective before acting
         display.display_map(
@@ -138,7 +141,7 @@ def run_simulation(N=N_DEFAULT, K=K_DEFAULT, p=P_DEFAULT, delay=0.3, moving_wump
             display.paused = True
 
         # 3. Agent makes a decision
-        #agent._determine_next_goal()
+        #agent._determine_next_goal_and_plan()
         chosen_action = agent.decide_action(current_percepts)
 
         # 4. The environment processes the action
@@ -192,6 +195,7 @@ def run_simulation(N=N_DEFAULT, K=K_DEFAULT, p=P_DEFAULT, delay=0.3, moving_wump
         # 5. Sync the agent's state and display the result of the action
         env_state = env.get_current_state()
         agent.update_state(env_state)
+        synced_version = env.state_version
         
         # For GUI: Update with the latest environment state, especially important for moving wumpuses
         if hasattr(env, 'game_map') and hasattr(display, 'update_environment_state'):
@@ -1,4 +1,5 @@
 # src/utils/constants.py
+import sys
 
 # --- Game Configuration Defaults ---
 N_DEFAULT = 8  # Default grid size (e.g., 8x8)
@@ -30,6 +31,33 @@ ACTION_GRAB = "Grab"
 ACTION_SHOOT = "Shoot"
 ACTION_CLIMB_OUT = "ClimbOut"
 
+# Interned explicitly so that comparisons against these names can short-circuit on
+# identity, whichever module or input the compared string came from.
+(PERCEPT_STENCH, PERCEPT_BREEZE, PERCEPT_GLITTER, PERCEPT_BUMP, PERCEPT_SCREAM) = map(
+    sys.intern, (PERCEPT_STENCH, PERCEPT_BREEZE, PERCEPT_GLITTER, PERCEPT_BUMP, PERCEPT_SCREAM))
+(ACTION_MOVE_FORWARD, ACTION_TURN_LEFT, ACTION_TURN_RIGHT, ACTION_GRAB, ACTION_SHOOT, ACTION_CLIMB_OUT) = map(
+    sys.intern, (ACTION_MOVE_FORWARD, ACTION_TURN_LEFT, ACTION_TURN_RIGHT, ACTION_GRAB, ACTION_SHOOT, ACTION_CLIMB_OUT))
+
+# Bit flags for percepts. The agent packs a step's percept list into one int so each
+# check during inference is a single AND.
+PERCEPT_STENCH_BIT = 1 << 0
+PERCEPT_BREEZE_BIT = 1 << 1
+PERCEPT_GLITTER_BIT = 1 << 2
+PERCEPT_SCREAM_BIT = 1 << 3
+PERCEPT_BUMP_BIT = 1 << 4
+PERCEPT_BITS = {
+    PERCEPT_STENCH: PERCEPT_STENCH_BIT,
+    PERCEPT_BREEZE: PERCEPT_BREEZE_BIT,
+    PERCEPT_GLITTER: PERCEPT_GLITTER_BIT,
+    PERCEPT_SCREAM: PERCEPT_SCREAM_BIT,
+    PERCEPT_BUMP: PERCEPT_BUMP_BIT,
+}
+# Percept names for every combination of the bit flags above, in PERCEPT_BITS order.
+PERCEPTS_BY_BITS = tuple(
+    tuple(percept for percept, bit in PERCEPT_BITS.items() if bits & bit)
+    for bits in range(1 << len(PERCEPT_BITS))
+)
+
 # --- Directions ---
 # Directions are represented as (dx, dy) tuples for coordinate changes.
 # The order is important for turning logic (e.g., TurnLeft from North -> West).
@@ -38,6 +66,10 @@ EAST = (1, 0)
 SOUTH = (0, -1)
 WEST = (-1, 0)
 DIRECTIONS = [NORTH, EAST, SOUTH, WEST]  # Order matters for turning
+# Position of each direction in DIRECTIONS, for code that turns by index arithmetic.
+# There are exactly four directions, so an index wraps around with `& DIR_MASK`.
+DIR_INDEX = {NORTH: 0, EAST: 1, SOUTH: 2, WEST: 3}
+DIR_MASK = len(DIRECTIONS) - 1
 
 # Symbols for displaying the agent's direction
 DIRECTION_SYMBOLS = {NORTH: "^", EAST: ">", SOUTH: "v", WEST: "<"}
@@ -62,4 +94,8 @@ GAME_STATE_LOST = "Lost"
 WUMPUS_MOVE_INTERVAL = 5
 RISK_UNKNOWN = 6
 RISK_DANGEROUS = 60
-RISK_VISITED_SOFT = 2 
\ No newline at end of file
+RISK_VISITED_SOFT = 2 
+
+# --- Planning ---
+# Maximum number of nearest safe unvisited cells the explore planner runs A* towards.
+MAX_EXPLORE_TARGETS = 4
@@ -0,0 +1,66 @@
+# src/utils/grid.py
+
+from functools import lru_cache
+
+from utils.constants import DIRECTIONS
+
+
+@lru_cache(maxsize=None)
+def neighbor_table(N):
+    """
+    Returns the in-bounds neighbors of every cell of an N x N grid, in DIRECTIONS order,
+    indexed as table[x][y]. The table is immutable and shared by every caller with the same N.
+    """
+    return tuple(
+        tuple(
+            tuple((x + dx, y + dy) for dx, dy in DIRECTIONS if 0 <= x + dx < N and 0 <= y + dy < N)
+            for y in range(N)
+        )
+        for x in range(N)
+    )
+
+
+@lru_cache(maxsize=None)
+def forward_table(N):
+    """
+    Returns, for every cell of an N x N grid and every direction index, the cell one step
+    ahead, or None at a wall, indexed as table[x][y][dir_idx]. Shared like neighbor_table.
+    """
+    return tuple(
+        tuple(
+            tuple((x + dx, y + dy) if 0 <= x + dx < N and 0 <= y + dy < N else None for dx, dy in DIRECTIONS)
+            for y in range(N)
+        )
+        for x in range(N)
+    )
+
+
+@lru_cache(maxsize=None)
+def ray_table(N):
+    """
+    Returns, for every cell of an N x N grid and every direction index, the cells a straight
+    line from it passes through up to the wall, nearest first, indexed as table[x][y][dir_idx].
+    Shared like neighbor_table.
+    """
+    return tuple(
+        tuple(
+            tuple(
+                tuple((x + i * dx, y + i * dy) for i in range(1, N) if 0 <= x + i * dx < N and 0 <= y + i * dy < N)
+                for dx, dy in DIRECTIONS
+            )
+            for y in range(N)
+        )
+        for x in range(N)
+    )
+
+
+@lru_cache(maxsize=None)
+def neighbor_index_table(N):
+    """
+    Returns the flat indices (x * N + y) of the cells in neighbor_table(N)[x][y], in the same
+    order, indexed as table[x][y]. Shared like neighbor_table.
+    """
+    return tuple(
+        tuple(tuple(nx * N + ny for nx, ny in cell_neighbors) for cell_neighbors in row)
+        for row in neighbor_table(N)
+    )
@@ -2,6 +2,7 @@ import pygame
 import os
 import time
 import copy
+from collections import deque
 from utils.constants import (
     WUMPUS_SYMBOL, PIT_SYMBOL, GOLD_SYMBOL, BREEZE_SYMBOL, STENCH_SYMBOL,
     PERCEPT_STENCH, PERCEPT_BREEZE, PERCEPT_GLITTER, PERCEPT_BUMP, PERCEPT_SCREAM,
@@ -53,8 +54,8 @@ class WumpusWorldGUI:
         # Game state tracking
         self.assets = {}
         self._load_assets()
-        self.log_messages = []
         self.max_log_messages = 100
+        self.log_messages = deque(maxlen=self.max_log_messages)  # Oldest messages fall off the front
         self.current_message = ""
         self.killed_wumpuses = set()
         self.env_map = {}
@@ -130,11 +131,8 @@ class WumpusWorldGUI:
         self.current_message = message
         
         if message:
+            # The deque's maxlen limits the number of messages we keep
             self.log_messages.append(message)
-            
-            # Limit the number of messages we keep
-            if len(self.log_messages) > self.max_log_messages:
-                self.log_messages.pop(0)
     
     def _draw_screen_background(self):
         """Draw the base background for the screen."""
@@ -419,7 +417,7 @@ class WumpusWorldGUI:
         # Determine how many lines we can fit and display the most recent messages
         line_height = 20
         max_displayable_lines = (log_height - 20) // line_height
-        display_messages = list(reversed(self.log_messages[-max_displayable_lines:]))
+        display_messages = list(reversed(list(self.log_messages)[-max_displayable_lines:]))
         
         # Draw the messages
         y_offset = 10
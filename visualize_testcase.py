@@ -5,8 +5,24 @@ import os
 import sys
 import json
 import argparse
+import sysconfig
 from pathlib import Path
 
+# Project-local virtual environment and its site-packages directory
+VENV_PATH = os.path.join(os.path.dirname(__file__), '.venv')
+
+def _venv_site_packages(venv_path):
+    """Returns the site-packages directory of the virtual environment at venv_path."""
+    # The default install scheme is not always a venv layout (e.g. posix_local on Debian's
+    # system Python), so use the dedicated 'venv' scheme where it exists (Python 3.11+).
+    if 'venv' in sysconfig.get_scheme_names():
+        return sysconfig.get_paths(scheme='venv', vars={'base': venv_path, 'platbase': venv_path})['purelib']
+    if os.name == 'nt':
+        return os.path.join(venv_path, 'Lib', 'site-packages')
+    return os.path.join(venv_path, 'lib', f'python{sys.version_info.major}.{sys.version_info.minor}', 'site-packages')
+
+VENV_SITE_PACKAGES = _venv_site_packages(VENV_PATH)
+
 # Add the src directory to the path for importing constants
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
@@ -24,6 +40,17 @@ def load_json_file(file_path):
     with open(file_path, 'r') as f:
         return json.load(f)
 
+def steps_as_rows(steps):
+    """Return result steps as a list of per-step dicts.
+
+    Results store steps column-wise ({field: [values...]}); older result files
+    store a list of per-step dicts, which is returned unchanged.
+    """
+    if isinstance(steps, dict):
+        fields = list(steps)
+        return [dict(zip(fields, values)) for values in zip(*steps.values())]
+    return steps
+
 def visualize_testcase_map(testcase_path):
     """Visualize a testcase map using ASCII characters."""
     testcase = load_json_file(testcase_path)
@@ -88,7 +115,7 @@ def visualize_result(result_path):
     # Extract data
     testcase_name = result.get('testcase_name')
     config = result.get('config', {})
-    steps = result.get('steps', [])
+    steps = steps_as_rows(result.get('steps', []))
     final_state = result.get('final_state', {})
     
     N = config.get('N')
@@ -205,12 +232,10 @@ def main():
     args = parser.parse_args()
     
     # Set up Python virtual environment if it exists
-    venv_path = os.path.join(os.path.dirname(__file__), '.venv')
-    if os.path.exists(venv_path):
-        print(f"Using Python virtual environment at {venv_path}")
+    if os.path.exists(VENV_PATH) and VENV_SITE_PACKAGES not in sys.path:
+        print(f"Using Python virtual environment at {VENV_PATH}")
         # Add the virtual environment's site-packages to sys.path
-        venv_site_packages = os.path.join(venv_path, 'lib', f'python{sys.version_info.major}.{sys.version_info.minor}', 'site-packages')
-        sys.path.insert(0, venv_site_packages)
+        sys.path.insert(0, VENV_SITE_PACKAGES)
     
     if args.testcase:
         if not os.path.exists(args.testcase):